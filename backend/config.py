@@ -39,6 +39,8 @@ class LLMConfig:
     retry_attempts: int = 3
     retry_delay: int = 5          # 5秒
     use_sdk: bool = True          # 默认使用 SDK
+    sectional_review: bool = False  # 按章节拆分评审并并行调用 LLM
+    max_parallel_calls: int = 4   # 章节评审的最大并发调用数
 
 
 @dataclass
@@ -105,6 +107,10 @@ class PromptConfig:
     # 提示词管理配置
     auto_reload: bool = True  # 自动重新加载提示词配置
     cache_enabled: bool = True  # 启用提示词缓存
+    render_cache_size: int = 128  # 渲染结果缓存的最大条目数
+    max_prompts: int = 256  # 内存中保留的已加载配置数上限，0 表示不限制
+    parse_cache: bool = False  # 将解析后的 YAML 缓存为旁路文件，源文件未修改时跳过解析
+    parse_cache_format: str = "json"  # 旁路文件格式: json 或 pickle
     # 提示词验证配置
     validate_on_load: bool = True  # 加载时验证提示词
     strict_mode: bool = False  # 严格模式：验证失败时抛出异常
@@ -164,6 +170,8 @@ class Config:
         self.llm.retry_attempts = int(os.getenv("LLM_RETRY_ATTEMPTS", str(self.llm.retry_attempts)))
         self.llm.retry_delay = int(os.getenv("LLM_RETRY_DELAY", str(self.llm.retry_delay)))
         self.llm.use_sdk = os.getenv("USE_ANTHROPIC_SDK", "true").lower() == "true"
+        self.llm.sectional_review = os.getenv("LLM_SECTIONAL_REVIEW", "false").lower() == "true"
+        self.llm.max_parallel_calls = int(os.getenv("LLM_MAX_PARALLEL_CALLS", str(self.llm.max_parallel_calls)))
 
         # 文件分析配置
         self.file_analysis.max_files = int(os.getenv("MAX_FILES", str(self.file_analysis.max_files)))
@@ -208,6 +216,10 @@ class Config:
         self.prompt.prompts_dir = os.getenv("PROMPTS_DIR", self.prompt.prompts_dir)
         self.prompt.auto_reload = os.getenv("PROMPT_AUTO_RELOAD", "true").lower() == "true"
         self.prompt.cache_enabled = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+        self.prompt.render_cache_size = int(os.getenv("PROMPT_RENDER_CACHE_SIZE", str(self.prompt.render_cache_size)))
+        self.prompt.max_prompts = int(os.getenv("PROMPT_MAX_PROMPTS", str(self.prompt.max_prompts)))
+        self.prompt.parse_cache = os.getenv("PROMPT_PARSE_CACHE", "false").lower() == "true"
+        self.prompt.parse_cache_format = os.getenv("PROMPT_PARSE_CACHE_FORMAT", self.prompt.parse_cache_format).lower()
         self.prompt.validate_on_load = os.getenv("PROMPT_VALIDATE_ON_LOAD", "true").lower() == "true"
         self.prompt.strict_mode = os.getenv("PROMPT_STRICT_MODE", "false").lower() == "true"
 
@@ -233,6 +245,9 @@ class Config:
         if self.llm.max_input_length <= 0:
             raise ValueError("max_input_length 必须大于 0")
 
+        if self.llm.max_parallel_calls <= 0:
+            raise ValueError("max_parallel_calls 必须大于 0")
+
         if self.llm.use_sdk:
             # SDK 模式验证
             if not self.llm.api_key:
@@ -263,6 +278,16 @@ class Config:
         if self.logging.level not in valid_levels:
             raise ValueError(f"无效的日志级别: {self.logging.level}")
 
+        # 验证提示词配置
+        if self.prompt.render_cache_size < 0:
+            raise ValueError("render_cache_size 不能小于 0")
+
+        if self.prompt.max_prompts < 0:
+            raise ValueError("max_prompts 不能小于 0")
+
+        if self.prompt.parse_cache_format not in ("json", "pickle"):
+            raise ValueError(f"无效的提示词解析缓存格式: {self.prompt.parse_cache_format}")
+
         # 验证存储配置
         if not self.storage.output_dir.strip():
             raise ValueError("output_dir 不能为空")
@@ -328,6 +353,8 @@ class Config:
                 "max_output_length": self.llm.max_output_length,
                 "retry_attempts": self.llm.retry_attempts,
                 "retry_delay": self.llm.retry_delay,
+                "sectional_review": self.llm.sectional_review,
+                "max_parallel_calls": self.llm.max_parallel_calls,
                 "api_key_configured": bool(self.llm.api_key),
                 "command_configured": bool(self.llm.command),
             },
@@ -367,6 +394,10 @@ class Config:
                 "prompts_dir": self.prompt.prompts_dir,
                 "auto_reload": self.prompt.auto_reload,
                 "cache_enabled": self.prompt.cache_enabled,
+                "render_cache_size": self.prompt.render_cache_size,
+                "max_prompts": self.prompt.max_prompts,
+                "parse_cache": self.prompt.parse_cache,
+                "parse_cache_format": self.prompt.parse_cache_format,
                 "validate_on_load": self.prompt.validate_on_load,
                 "strict_mode": self.prompt.strict_mode,
             }
@@ -86,6 +86,8 @@ def get_task_detail(task_id: str):
                 'iterations': task.iterations,
                 'created_at': task.created_at,
                 'status': task.status,
+                'docx_path': task.docx_path,
+                'docx_status': task.docx_status,
                 'rounds': rounds
             }
         })
@@ -98,6 +100,43 @@ def get_task_detail(task_id: str):
         }), 500
 
 
+@conversation_bp.route('/tasks/<task_id>/docx', methods=['GET'])
+def get_task_docx_status(task_id: str):
+    """
+    获取任务的 DOCX 生成状态（供前端轮询后台生成结果）
+
+    Args:
+        task_id: 任务ID
+
+    Returns:
+        JSON: DOCX 路径与状态
+    """
+    try:
+        conversation_db = get_conversation_db()
+        task = conversation_db.get_task(task_id)
+
+        if not task:
+            return jsonify({
+                'success': False,
+                'error': '任务不存在'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'docx_path': task.docx_path,
+                'docx_status': task.docx_status
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"获取任务DOCX状态失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @conversation_bp.route('/tasks/<task_id>/rounds', methods=['GET'])
 def get_task_rounds(task_id: str):
     """
@@ -24,6 +24,8 @@ class TaskInfo:
     iterations: int
     created_at: str
     status: str = "running"
+    docx_path: Optional[str] = None
+    docx_status: Optional[str] = None
 
 
 @dataclass
@@ -76,6 +78,13 @@ class ConversationDB:
                     )
                 ''')
 
+                # 自动迁移：为旧数据库补充 DOCX 状态字段
+                cursor.execute("PRAGMA table_info(tasks)")
+                task_columns = {row[1] for row in cursor.fetchall()}
+                for column in ("docx_path", "docx_status"):
+                    if column not in task_columns:
+                        cursor.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+
                 # 创建对话轮次表
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS conversation_rounds (
@@ -187,6 +196,56 @@ class ConversationDB:
             logger.error(f"添加对话轮次失败: {e}")
             raise
 
+    def add_conversation_rounds_bulk(self, task_id: str, rounds: List[Dict[str, Any]]) -> int:
+        """
+        批量添加对话轮次（单个事务，一次提交）
+
+        Args:
+            task_id: 任务ID
+            rounds: 对话轮次列表，每项包含 round_number、role、prompt、response，
+                可选 timestamp（缺省为写入时间）
+
+        Returns:
+            写入的记录数
+        """
+        if not rounds:
+            return 0
+
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                task_id,
+                r['round_number'],
+                r['role'],
+                r['prompt'],
+                r['response'],
+                r.get('timestamp') or now
+            )
+            for r in rounds
+        ]
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT INTO conversation_rounds
+                    (task_id, round_number, role, prompt, response, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+
+                # 更新任务的最后修改时间
+                cursor.execute('''
+                    UPDATE tasks SET updated_at = ? WHERE id = ?
+                ''', (rows[-1][5], task_id))
+
+                conn.commit()
+                logger.info(f"批量添加对话轮次成功: task_id={task_id}, count={len(rows)}")
+                return len(rows)
+
+        except Exception as e:
+            logger.error(f"批量添加对话轮次失败: {e}")
+            raise
+
     def get_all_tasks(self) -> List[TaskInfo]:
         """
         获取所有任务列表
@@ -239,7 +298,8 @@ class ConversationDB:
                 cursor = conn.cursor()
 
                 cursor.execute('''
-                    SELECT id, title, context, iterations, created_at, status, base_name
+                    SELECT id, title, context, iterations, created_at, status, base_name,
+                           docx_path, docx_status
                     FROM tasks
                     WHERE id = ?
                 ''', (task_id,))
@@ -252,7 +312,9 @@ class ConversationDB:
                         context=row['context'],
                         iterations=row['iterations'],
                         created_at=row['created_at'],
-                        status=row['status']
+                        status=row['status'],
+                        docx_path=row['docx_path'],
+                        docx_status=row['docx_status']
                     )
 
                 return None
@@ -401,6 +463,32 @@ class ConversationDB:
             logger.error(f"更新任务状态失败: {e}")
             raise
 
+    def update_task_docx(self, task_id: str, docx_path: Optional[str], docx_status: str):
+        """
+        更新任务的 DOCX 生成结果
+
+        Args:
+            task_id: 任务ID
+            docx_path: DOCX 文件路径，生成失败时为None
+            docx_status: DOCX 状态 ('pending', 'completed', 'failed')
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    UPDATE tasks
+                    SET docx_path = ?, docx_status = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (docx_path, docx_status, datetime.now().isoformat(), task_id))
+
+                conn.commit()
+                logger.info(f"更新任务DOCX状态成功: {task_id} -> {docx_status}")
+
+        except Exception as e:
+            logger.error(f"更新任务DOCX状态失败: {e}")
+            raise
+
     def close(self):
         """关闭数据库连接"""
         # SQLite不需要显式关闭连接
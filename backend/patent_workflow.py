@@ -1,8 +1,17 @@
 import os
+import re
+import hashlib
+import sys
+import time
 import logging
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Tuple
 
+from config import get_config
 from llm_client import call_llm
 from prompt_manager import get_prompt, PromptKeys
 from template_manager import get_template_manager
@@ -12,6 +21,62 @@ from user_prompt_manager import get_user_prompt_manager
 
 logger = logging.getLogger(__name__)
 
+# 角色名称（用户提示词类型及对话记录中的 role 字段）
+ROLE_WRITER = sys.intern("writer")
+ROLE_MODIFIER = sys.intern("modifier")
+ROLE_REVIEWER = sys.intern("reviewer")
+ROLE_TEMPLATE = sys.intern("template")
+
+# 非严格模式下支持的 {{变量}} 占位符
+_PLACEHOLDER_RE = re.compile(
+    r"\{\{(context|previous_draft|previous_review|iteration|total_iterations"
+    r"|current_iteration|total_rounds|tech_context)\}\}"
+)
+
+# 严格模式下支持的动态标记（按日志输出顺序）
+_STRICT_MARKERS = ("<previous_output>", "<previous_review>", "</text>", "<idea_text>")
+_STRICT_MARKER_RE = re.compile("|".join(re.escape(m) for m in _STRICT_MARKERS))
+
+# Markdown 标题行（用于按章节拆分草案）
+_MARKDOWN_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+
+
+def _has_nonspace(text: Optional[str]) -> bool:
+    """判断文本是否包含非空白字符（不像 strip() 那样复制整个字符串）"""
+    return bool(text) and not text.isspace()
+
+
+# 用户自定义提示词的短时缓存窗口（秒）
+_USER_PROMPT_TTL = 2
+
+# 绑定的用户提示词管理器实例（首次使用时获取）
+_user_pm_instance = None
+
+
+def _user_pm():
+    """获取绑定的用户提示词管理器，避免每次调用都经过单例查找"""
+    global _user_pm_instance
+    if _user_pm_instance is None:
+        _user_pm_instance = get_user_prompt_manager()
+    return _user_pm_instance
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_user_prompt(role: str, bucket: int, version: int) -> Optional[str]:
+    """按时间窗口和数据版本缓存的用户自定义提示词"""
+    return _user_pm().get_user_prompt(role)
+
+
+def _get_user_prompt(role: str) -> Optional[str]:
+    """获取用户自定义提示词，同一时间窗口内复用读取结果；用户修改提示词后立即失效"""
+    manager = _user_pm()
+    # 绝大多数情况下用户未设置自定义提示词，直接跳过读取
+    if not manager.has_any(role):
+        return None
+    version = manager.version
+    return _cached_user_prompt(role, int(time.monotonic() // _USER_PROMPT_TTL), version)
+
+
 # 简单提示词逻辑（直接嵌入，避免复杂依赖）
 def get_simple_prompt_engine():
     """获取简单提示词引擎实例（内联实现）"""
@@ -120,10 +185,10 @@ def get_simple_prompt_engine():
                     logger.info(f"idea_text内容预览: {idea_text[:100]}...")
 
                 try:
-                    user_prompt = self.user_prompt_manager.get_user_prompt('writer')
+                    user_prompt = self.user_prompt_manager.get_user_prompt(ROLE_WRITER)
                     logger.info(f"用户撰写者提示词检查: 存在={bool(user_prompt)}")
 
-                    if user_prompt and user_prompt.strip():
+                    if _has_nonspace(user_prompt):
                         logger.info(f"用户提示词长度: {len(user_prompt)} 字符")
                         logger.info(f"用户提示词开头: {user_prompt[:100]}...")
                         logger.info(f"用户提示词是否包含<idea_text>标记: {'<idea_text>' in user_prompt}")
@@ -131,7 +196,7 @@ def get_simple_prompt_engine():
                         # 检查是否包含 <idea_text> 标记，如果有则进行替换
                         if "<idea_text>" in user_prompt:
                             logger.info("🔍 检测到<idea_text>标记，启用创意文本替换")
-                            if idea_text and idea_text.strip():
+                            if _has_nonspace(idea_text):
                                 logger.info(f"✅ idea_text内容有效，开始替换")
                                 original_prompt = user_prompt
                                 user_prompt = user_prompt.replace("<idea_text>", idea_text)
@@ -159,7 +224,7 @@ def get_simple_prompt_engine():
 
                         if "<idea_text>" in default_prompt:
                             logger.info("🔍 检测到系统默认提示词中的<idea_text>标记，启用创意文本替换")
-                            if idea_text and idea_text.strip():
+                            if _has_nonspace(idea_text):
                                 logger.info(f"✅ idea_text内容有效，开始替换默认提示词")
                                 original_prompt = default_prompt
                                 default_prompt = default_prompt.replace("<idea_text>", idea_text)
@@ -185,10 +250,10 @@ def get_simple_prompt_engine():
                 logger.info("=== 开始获取审核者提示词 ===")
 
                 try:
-                    user_prompt = self.user_prompt_manager.get_user_prompt('reviewer')
+                    user_prompt = self.user_prompt_manager.get_user_prompt(ROLE_REVIEWER)
                     logger.info(f"用户审核者提示词检查: 存在={bool(user_prompt)}")
 
-                    if user_prompt and user_prompt.strip():
+                    if _has_nonspace(user_prompt):
                         logger.info(f"用户提示词长度: {len(user_prompt)} 字符")
                         logger.info(f"用户提示词开头: {user_prompt[:100]}...")
 
@@ -220,10 +285,10 @@ def get_simple_prompt_engine():
                 logger.info("=== 开始获取修改者提示词 ===")
 
                 try:
-                    user_prompt = self.user_prompt_manager.get_user_prompt('modifier')
+                    user_prompt = self.user_prompt_manager.get_user_prompt(ROLE_MODIFIER)
                     logger.info(f"用户修改者提示词检查: 存在={bool(user_prompt)}")
 
-                    if user_prompt and user_prompt.strip():
+                    if _has_nonspace(user_prompt):
                         logger.info(f"用户提示词长度: {len(user_prompt)} 字符")
                         logger.info(f"用户提示词开头: {user_prompt[:100]}...")
 
@@ -269,10 +334,10 @@ def get_simple_prompt_engine():
                 logger.info("=== 开始获取模板分析提示词 ===")
 
                 try:
-                    user_prompt = self.user_prompt_manager.get_user_prompt('template')
+                    user_prompt = self.user_prompt_manager.get_user_prompt(ROLE_TEMPLATE)
                     logger.info(f"用户模板分析提示词检查: 存在={bool(user_prompt)}")
 
-                    if user_prompt and user_prompt.strip():
+                    if _has_nonspace(user_prompt):
                         logger.info(f"用户提示词长度: {len(user_prompt)} 字符")
                         logger.info("✅ 使用用户自定义模板分析提示词")
                         return user_prompt
@@ -344,9 +409,9 @@ def build_writer_prompt(
 
         # 优先检查用户自定义提示词
         user_prompt_manager = get_user_prompt_manager()
-        user_custom_prompt = user_prompt_manager.get_user_prompt('writer')
+        user_custom_prompt = user_prompt_manager.get_user_prompt(ROLE_WRITER)
 
-        if user_custom_prompt and user_custom_prompt.strip():
+        if _has_nonspace(user_custom_prompt):
             logger.info("使用用户自定义撰写者提示词")
             logger.debug(f"用户自定义提示词长度: {len(user_custom_prompt)} 字符")
 
@@ -470,9 +535,9 @@ def build_reviewer_prompt(
 
         # 优先检查用户自定义提示词
         user_prompt_manager = get_user_prompt_manager()
-        user_custom_prompt = user_prompt_manager.get_user_prompt('reviewer')
+        user_custom_prompt = user_prompt_manager.get_user_prompt(ROLE_REVIEWER)
 
-        if user_custom_prompt and user_custom_prompt.strip():
+        if _has_nonspace(user_custom_prompt):
             logger.info("使用用户自定义审核者提示词")
             logger.debug(f"用户自定义提示词长度: {len(user_custom_prompt)} 字符")
 
@@ -555,6 +620,96 @@ def _build_reviewer_prompt_fallback(
     return "\n".join(parts)
 
 
+def split_draft_sections(current_draft: str) -> List[Tuple[str, str]]:
+    """
+    按顶层 Markdown 标题拆分专利草案
+
+    顶层指出现至少两次的最浅标题级别，例如草案以 "# 标题" 开头、
+    各章节使用 "## 技术领域" 等二级标题时，按二级标题拆分。
+
+    Args:
+        current_draft: 专利草案
+
+    Returns:
+        (章节标题, 章节内容) 列表，无法拆分时返回空列表
+    """
+    headings = list(_MARKDOWN_HEADING_RE.finditer(current_draft or ""))
+    level_counts: Dict[int, int] = {}
+    for m in headings:
+        level = len(m.group(1))
+        level_counts[level] = level_counts.get(level, 0) + 1
+
+    levels = sorted(level for level, count in level_counts.items() if count >= 2)
+    if not levels:
+        return []
+
+    top_headings = [m for m in headings if len(m.group(1)) == levels[0]]
+    sections = []
+    for idx, m in enumerate(top_headings):
+        end = top_headings[idx + 1].start() if idx + 1 < len(top_headings) else len(current_draft)
+        sections.append((m.group(2), current_draft[m.start():end].strip()))
+    return sections
+
+
+def build_sectional_reviewer_prompts(
+    context: str,
+    current_draft: str,
+    iteration: int,
+    total_iterations: int,
+) -> List[Tuple[str, str]]:
+    """
+    为草案的每个顶层章节构建一个独立的评审提示词
+
+    Args:
+        context: 技术背景和创新点上下文
+        current_draft: 当前待评审的专利草案
+        iteration: 当前评审轮次
+        total_iterations: 总评审轮次
+
+    Returns:
+        (章节标题, 提示词) 列表，草案少于两个章节时返回空列表
+    """
+    sections = split_draft_sections(current_draft)
+    if len(sections) < 2:
+        return []
+
+    outline = "\n".join(f"- {title}" for title, _ in sections)
+    prompts = []
+    for title, body in sections:
+        parts = []
+        parts.append("你现在扮演一名资深专利代理人 / 合规审查专家。")
+        parts.append(f"任务：仅对专利草案中的「{title}」章节进行严格审查，找出合规风险、缺陷和可改进之处，并给出条理清晰的修改建议。")
+        parts.append("")
+        parts.append(f"这是第 {iteration}/{total_iterations} 轮审查。")
+        parts.append("")
+        parts.append("【技术背景与创新点上下文】")
+        parts.append(context)
+        parts.append("")
+        parts.append("【草案章节目录】")
+        parts.append(outline)
+        parts.append("")
+        parts.append("【当前审查章节】")
+        parts.append(body)
+        parts.append("")
+        parts.append("请以 Markdown 输出该章节的问题清单（每条包括问题描述和修改建议），不要重写章节内容。")
+        prompts.append((title, "\n".join(parts)))
+    return prompts
+
+
+def _run_sectional_review(section_prompts: List[Tuple[str, str]]) -> str:
+    """并行调用 LLM 评审各章节，并按章节顺序合并评审结果"""
+    max_workers = min(len(section_prompts), get_config().llm.max_parallel_calls)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review") as executor:
+        reviews = list(executor.map(call_llm, [prompt for _, prompt in section_prompts]))
+
+    parts = []
+    for (title, _), section_review in zip(section_prompts, reviews):
+        parts.append(f"## {title}")
+        parts.append(section_review.strip())
+        parts.append("")
+    return "\n".join(parts)
+
+
 def ensure_output_dir() -> str:
     out_dir = os.path.join(os.getcwd(), "output")
     os.makedirs(out_dir, exist_ok=True)
@@ -568,6 +723,76 @@ def build_output_filename(base_name: Optional[str]) -> str:
     return os.path.join(out_dir, f"{safe_base}-{ts}.md")
 
 
+# DOCX 后台生成队列：单个守护线程串行渲染，不阻塞请求，也不阻塞解释器退出
+_docx_queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+_docx_worker: Optional[threading.Thread] = None
+_docx_worker_lock = threading.Lock()
+
+
+def _docx_worker_loop() -> None:
+    while True:
+        job = _docx_queue.get()
+        try:
+            job()
+        except Exception as e:
+            logger.warning(f"DOCX 后台任务异常: {e}")
+
+
+def _ensure_docx_worker() -> None:
+    global _docx_worker
+    with _docx_worker_lock:
+        if _docx_worker is None or not _docx_worker.is_alive():
+            _docx_worker = threading.Thread(
+                target=_docx_worker_loop, name="docx-worker", daemon=True
+            )
+            _docx_worker.start()
+
+
+def _generate_docx(markdown_content: str, template_path: str, docx_path: str) -> bool:
+    try:
+        success = generate_patent_docx(
+            markdown_content=markdown_content,
+            template_path=template_path,
+            output_path=docx_path
+        )
+    except Exception as e:
+        logger.warning(f"生成 DOCX 文档失败: {e}")
+        success = False
+
+    if success:
+        logger.info(f"DOCX 文件已保存到: {docx_path}")
+    else:
+        logger.warning(f"DOCX 生成失败: {docx_path}")
+    return bool(success)
+
+
+def _submit_docx_generation(
+    task_id: str,
+    markdown_content: str,
+    template_path: str,
+    docx_path: str,
+) -> None:
+    """在后台线程中生成 DOCX 文档，完成后将结果写回任务记录（前端据此轮询状态）"""
+    def _generate() -> None:
+        success = _generate_docx(markdown_content, template_path, docx_path)
+        try:
+            get_conversation_db().update_task_docx(
+                task_id,
+                docx_path if success else None,
+                "completed" if success else "failed"
+            )
+        except Exception as e:
+            logger.warning(f"更新任务DOCX状态失败: {e}")
+
+    try:
+        get_conversation_db().update_task_docx(task_id, None, "pending")
+    except Exception as e:
+        logger.warning(f"更新任务DOCX状态失败: {e}")
+
+    _ensure_docx_worker()
+    _docx_queue.put(_generate)
+
+
 def run_patent_iteration(
     context: str,
     iterations: int,
@@ -658,12 +883,18 @@ def run_patent_iteration(
             update_progress(6, "模板加载失败，将不使用模板")
             use_template = False
 
+    pending_rounds = []
+    last_draft_hash: Optional[bytes] = None
+    last_reviewer_prompt: Optional[str] = None
+
+    # 预先计算每轮的进度范围：90% 用于迭代，10% 用于文件保存；每轮中撰写占45%，评审占40%
+    progress_marks = []
+    for i in range(1, total + 1):
+        base_progress = (i - 1) * (90 / total)
+        progress_marks.append((i, base_progress, base_progress + 45 / total, base_progress + 85 / total))
+
     try:
-        for i in range(1, total + 1):
-            # 计算当前轮次的进度范围
-            base_progress = (i - 1) * (90 / total)  # 90% 用于迭代，10% 用于文件保存
-            writer_progress = base_progress + (45 / total)  # 每轮中撰写占45%
-            reviewer_progress = base_progress + (85 / total)  # 每轮中评审占40%
+        for i, base_progress, writer_progress, reviewer_progress in progress_marks:
 
             update_progress(base_progress, f"第 {i}/{total} 轮：准备撰写阶段")
 
@@ -676,14 +907,14 @@ def run_patent_iteration(
                 # 第一轮：使用撰写者
                 update_progress(base_progress, f"第 {i}/{total} 轮：撰写者创建初始专利草案")
                 prompt_method = simple_prompt_engine.get_writer_prompt
-                role_name = 'writer'
+                role_name = ROLE_WRITER
                 role_display = '撰写者'
                 logger.info(f"📝 第 {i} 轮：使用撰写者角色")
             else:
                 # 第二轮及以后：使用修改者
                 update_progress(base_progress, f"第 {i}/{total} 轮：修改者优化专利草案")
                 prompt_method = simple_prompt_engine.get_modifier_prompt
-                role_name = 'modifier'
+                role_name = ROLE_MODIFIER
                 role_display = '修改者'
                 logger.info(f"✏️ 第 {i} 轮：使用修改者角色")
 
@@ -693,26 +924,15 @@ def run_patent_iteration(
             if idea_text:
                 logger.info(f"idea_text长度: {len(idea_text)}")
 
-            if role_name == 'writer':
-                logger.info(f"📋 调用 get_writer_prompt 方法...")
-                current_prompt = prompt_method(
-                    context=context,
-                    previous_draft=draft,
-                    previous_review=review,
-                    iteration=i,
-                    total_iterations=total,
-                    idea_text=idea_text  # 传递创意文本参数
-                )
-            else:  # modifier
-                logger.info(f"📋 调用 get_modifier_prompt 方法...")
-                current_prompt = prompt_method(
-                    context=context,
-                    previous_draft=draft,
-                    previous_review=review,
-                    iteration=i,
-                    total_iterations=total,
-                    idea_text=idea_text  # 传递创意文本参数
-                )
+            logger.info(f"📋 调用 {prompt_method.__name__} 方法...")
+            current_prompt = prompt_method(
+                context=context,
+                previous_draft=draft,
+                previous_review=review,
+                iteration=i,
+                total_iterations=total,
+                idea_text=idea_text  # 传递创意文本参数
+            )
 
             logger.info(f"✅ {role_display} 提示词获取完成，长度: {len(current_prompt)} 字符")
             logger.info(f"提示词开头预览: {current_prompt[:200]}...")
@@ -721,18 +941,15 @@ def run_patent_iteration(
             draft = call_llm(current_prompt)
             update_progress(writer_progress, f"第 {i}/{total} 轮：{role_display}工作完成")
 
-            # 记录对话到数据库
-            if task_id and conversation_db:
-                try:
-                    conversation_db.add_conversation_round(
-                        task_id=task_id,
-                        round_number=i,
-                        role=role_name,
-                        prompt=current_prompt,
-                        response=draft
-                    )
-                except Exception as e:
-                    logger.warning(f"记录{role_display}对话失败: {e}")
+            # 缓存对话记录，流程结束后统一写入数据库
+            if task_id:
+                pending_rounds.append({
+                    'round_number': i,
+                    'role': role_name,
+                    'prompt': current_prompt,
+                    'response': draft,
+                    'timestamp': datetime.now().isoformat()
+                })
 
             # 评审阶段 - 使用新的简单提示词引擎
             reviewer_prompt = simple_prompt_engine.get_reviewer_prompt(
@@ -741,26 +958,49 @@ def run_patent_iteration(
                 iteration=i,
                 total_iterations=total
             )
-            update_progress(reviewer_progress - 5, f"第 {i}/{total} 轮：调用 LLM 进行评审")
-            review = call_llm(reviewer_prompt)
-            update_progress(reviewer_progress, f"第 {i}/{total} 轮：评审完成")
 
-            # 记录审批者对话到数据库
-            if task_id and conversation_db:
-                try:
-                    conversation_db.add_conversation_round(
-                        task_id=task_id,
-                        round_number=i,
-                        role='reviewer',
-                        prompt=reviewer_prompt,
-                        response=review
-                    )
-                except Exception as e:
-                    logger.warning(f"记录审批者对话失败: {e}")
+            # 章节评审：仅在未设置用户自定义审核者提示词时启用，保证自定义提示词原样执行
+            section_prompts = []
+            if get_config().llm.sectional_review and not _get_user_prompt(ROLE_REVIEWER):
+                section_prompts = build_sectional_reviewer_prompts(context, draft, i, total)
+                if section_prompts:
+                    reviewer_prompt = "\n\n---\n\n".join(prompt for _, prompt in section_prompts)
+            # 草案与评审提示词均未变化时，评审结果必然相同，直接复用上一轮评审
+            draft_hash = hashlib.blake2b((draft or "").encode("utf-8"), digest_size=16).digest()
+            if draft_hash == last_draft_hash and reviewer_prompt == last_reviewer_prompt:
+                logger.info(f"第 {i}/{total} 轮：草案与上一轮相同，复用上一轮评审结果")
+                update_progress(reviewer_progress, f"第 {i}/{total} 轮：草案未变化，沿用上一轮评审")
+            else:
+                update_progress(reviewer_progress - 5, f"第 {i}/{total} 轮：调用 LLM 进行评审")
+                if section_prompts:
+                    logger.info(f"第 {i}/{total} 轮：并行评审 {len(section_prompts)} 个章节")
+                    review = _run_sectional_review(section_prompts)
+                else:
+                    review = call_llm(reviewer_prompt)
+                last_draft_hash = draft_hash
+                last_reviewer_prompt = reviewer_prompt
+                update_progress(reviewer_progress, f"第 {i}/{total} 轮：评审完成")
+
+            # 缓存审批者对话记录
+            if task_id:
+                pending_rounds.append({
+                    'round_number': i,
+                    'role': ROLE_REVIEWER,
+                    'prompt': reviewer_prompt,
+                    'response': review,
+                    'timestamp': datetime.now().isoformat()
+                })
 
     except Exception as e:
         update_progress(95, f"处理过程中出现错误: {str(e)}")
         raise
+    finally:
+        # 单个事务批量写入所有轮次，失败时也保留已完成轮次
+        if task_id and conversation_db and pending_rounds:
+            try:
+                conversation_db.add_conversation_rounds_bulk(task_id, pending_rounds)
+            except Exception as e:
+                logger.warning(f"记录对话失败: {e}")
 
     update_progress(95, "正在生成最终文档并保存文件")
 
@@ -781,11 +1021,13 @@ def run_patent_iteration(
     # 保存文件
     output_path = build_output_filename(base_name)
     docx_path = None
+    docx_status = None
 
     try:
-        # 保存 Markdown 文件
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final_markdown)
+        # 保存 Markdown 文件（一次性编码后以二进制写入，跳过文本层的分块编码）
+        data = final_markdown.encode("utf-8")
+        with open(output_path, "wb") as f:
+            f.write(data)
         update_progress(95, f"Markdown 文件已保存到: {output_path}")
 
         # 如果启用模板功能，生成 DOCX 文件
@@ -811,18 +1053,23 @@ def run_patent_iteration(
                         docx_filename = f"{base_name_without_ext}.docx"
                         docx_path = os.path.join(output_dir, docx_filename)
 
-                        update_progress(96, f"正在使用模板生成 DOCX 文档...")
-
-                        # 生成 DOCX 文档
-                        success = generate_patent_docx(
-                            markdown_content=final_markdown,
-                            template_path=template_info['file_path'],
-                            output_path=docx_path
-                        )
-
-                        if success:
-                            update_progress(100, f"专利生成完成，DOCX 文件已保存到: {docx_path}")
+                        if task_id:
+                            # DOCX 渲染耗时较长，提交到后台线程，不阻塞当前请求；
+                            # 状态写入任务记录，前端按 task_id 轮询
+                            _submit_docx_generation(
+                                task_id=task_id,
+                                markdown_content=final_markdown,
+                                template_path=template_info['file_path'],
+                                docx_path=docx_path
+                            )
+                            docx_status = "pending"
+                            update_progress(100, f"专利生成完成，DOCX 文档正在后台生成: {docx_path}")
+                        elif _generate_docx(final_markdown, template_info['file_path'], docx_path):
+                            # 无任务记录可供轮询时同步生成，只返回已存在的文件
+                            docx_status = "completed"
+                            update_progress(100, f"DOCX 文件已保存到: {docx_path}")
                         else:
+                            docx_path = None
                             update_progress(100, f"DOCX 生成失败，使用 Markdown 文件: {output_path}")
                     else:
                         update_progress(100, f"选定的模板无效，使用 Markdown 文件: {output_path}")
@@ -854,6 +1101,7 @@ def run_patent_iteration(
     # 添加 DOCX 相关信息
     if docx_path:
         result["docx_path"] = docx_path
+        result["docx_status"] = docx_status
         result["template_used"] = True
         result["template_id"] = selected_template_id
 
@@ -897,63 +1145,35 @@ def _build_prompt_from_template(
 
         # 严格模式下的特殊处理：支持动态替换
         if strict_mode:
-            has_dynamic_markers = False
-
-            # 支持修改者专用标记 <previous_output>
-            if "<previous_output>" in prompt:
-                has_dynamic_markers = True
-                logger.info("检测到<previous_output>标记，启用动态内容替换")
-                if previous_draft:
-                    original_length = len(prompt)
-                    prompt = prompt.replace("<previous_output>", previous_draft)
-                    logger.info(f"成功替换<previous_output>标记，替换内容长度: {len(previous_draft)} 字符")
-                    logger.info(f"替换后提示词总长度: {len(prompt)} 字符（原长度: {original_length}）")
-                else:
-                    logger.warning("检测到<previous_output>标记但没有previous_draft内容，保持原标记")
-                    prompt = prompt.replace("<previous_output>", "[上轮专利生成结果]")
-
-            # 支持修改者专用标记 <previous_review>
-            if "<previous_review>" in prompt:
-                has_dynamic_markers = True
-                logger.info("检测到<previous_review>标记，启用动态内容替换")
-                if previous_review:
-                    original_length = len(prompt)
-                    prompt = prompt.replace("<previous_review>", previous_review)
-                    logger.info(f"成功替换<previous_review>标记，替换内容长度: {len(previous_review)} 字符")
-                    logger.info(f"替换后提示词总长度: {len(prompt)} 字符（原长度: {original_length}）")
-                else:
-                    logger.warning("检测到<previous_review>标记但没有previous_review内容，保持原标记")
-                    prompt = prompt.replace("<previous_review>", "[上轮审批评审意见]")
-
-            # 向后兼容：继续支持 </text> 标记
-            if "</text>" in prompt:
-                has_dynamic_markers = True
-                logger.info("检测到</text>标记，启用动态内容替换")
-                if current_draft:
-                    original_length = len(prompt)
-                    prompt = prompt.replace("</text>", current_draft)
-                    logger.info(f"成功替换</text>标记，替换内容长度: {len(current_draft)} 字符")
-                    logger.info(f"替换后提示词总长度: {len(prompt)} 字符（原长度: {original_length}）")
-                else:
-                    logger.warning("检测到</text>标记但没有current_draft内容，保持原标记")
-                    prompt = prompt.replace("</text>", "[当前专利草案内容]")
-                    logger.info("已将</text>标记替换为提示文本")
-
-            # 支持创意模式专用标记 <idea_text>
-            if "<idea_text>" in prompt:
-                has_dynamic_markers = True
-                logger.info("检测到<idea_text>标记，启用创意文本替换")
-                if idea_text:
-                    original_length = len(prompt)
-                    prompt = prompt.replace("<idea_text>", idea_text)
-                    logger.info(f"成功替换<idea_text>标记，替换内容长度: {len(idea_text)} 字符")
-                    logger.info(f"替换后提示词总长度: {len(prompt)} 字符（原长度: {original_length}）")
-                else:
-                    logger.warning("检测到<idea_text>标记但没有创意文本内容")
-                    prompt = prompt.replace("<idea_text>", "[用户创意内容]")
+            found_markers = set(_STRICT_MARKER_RE.findall(prompt))
+
+            if found_markers:
+                # 标记 -> (替换内容, 内容缺失时的占位文本, 内容名称)
+                marker_sources = {
+                    "<previous_output>": (previous_draft, "[上轮专利生成结果]", "previous_draft"),
+                    "<previous_review>": (previous_review, "[上轮审批评审意见]", "previous_review"),
+                    "</text>": (current_draft, "[当前专利草案内容]", "current_draft"),
+                    "<idea_text>": (idea_text, "[用户创意内容]", "创意文本"),
+                }
+                marker_values = {}
+                for marker in _STRICT_MARKERS:
+                    if marker not in found_markers:
+                        continue
+                    value, fallback, source_name = marker_sources[marker]
+                    logger.info(f"检测到{marker}标记，启用动态内容替换")
+                    if value:
+                        marker_values[marker] = value
+                        logger.info(f"替换{marker}标记，替换内容长度: {len(value)} 字符")
+                    else:
+                        marker_values[marker] = fallback
+                        logger.warning(f"检测到{marker}标记但没有{source_name}内容，替换为提示文本")
 
-            # 如果没有动态标记，直接返回原提示词
-            if not has_dynamic_markers:
+                # 单次扫描完成所有标记替换，替换内容中的标记不会被二次替换
+                original_length = len(prompt)
+                prompt = _STRICT_MARKER_RE.sub(lambda m: marker_values[m.group(0)], prompt)
+                logger.info(f"替换后提示词总长度: {len(prompt)} 字符（原长度: {original_length}）")
+            else:
+                # 如果没有动态标记，直接返回原提示词
                 logger.info(f"严格模式已启用：直接使用用户输入的提示词（无动态标记）")
                 logger.info(f"严格模式提示词长度: {len(prompt)} 字符")
                 logger.info(f"严格模式提示词开头: {prompt[:100]}...")
@@ -968,34 +1188,33 @@ def _build_prompt_from_template(
         # 正常模式：进行变量替换和内容增强
         # 替换基本变量
         replacements = {
-            "{{context}}": context or "",
-            "{{previous_draft}}": previous_draft or "",
-            "{{previous_review}}": previous_review or "",
-            "{{iteration}}": str(iteration),
-            "{{total_iterations}}": str(total_iterations),
-            "{{current_iteration}}": str(iteration),
-            "{{total_rounds}}": str(total_iterations)
+            "context": context or "",
+            "previous_draft": previous_draft or "",
+            "previous_review": previous_review or "",
+            "iteration": str(iteration),
+            "total_iterations": str(total_iterations),
+            "current_iteration": str(iteration),
+            "total_rounds": str(total_iterations)
         }
 
-        # 执行替换
-        for placeholder, value in replacements.items():
-            prompt = prompt.replace(placeholder, value)
+        # 如果模板中有技术上下文占位符，且存在历史草案，替换为用户提供的上下文
+        if previous_draft:
+            replacements["tech_context"] = context or ""
+
+        # 执行替换（单次扫描）
+        prompt = _PLACEHOLDER_RE.sub(
+            lambda m: replacements.get(m.group(1), m.group(0)), prompt
+        )
 
         # 处理 <idea_text> 标记（非严格模式）
         if "<idea_text>" in prompt:
             if idea_text:
-                original_length = len(prompt)
                 prompt = prompt.replace("<idea_text>", idea_text)
                 logger.info(f"非严格模式：成功替换<idea_text>标记，替换内容长度: {len(idea_text)} 字符")
             else:
                 logger.warning("非严格模式：检测到<idea_text>标记但没有创意文本内容")
                 prompt = prompt.replace("<idea_text>", "[用户创意内容]")
 
-        # 添加历史内容章节（如果需要且用户模板中包含相应占位符）
-        if previous_draft and "{{tech_context}}" in prompt:
-            # 如果模板中有技术上下文占位符，替换为用户提供的上下文
-            prompt = prompt.replace("{{tech_context}}", context or "")
-
         # 添加迭代信息
         if "这是第" not in prompt and f"第 {iteration}/{total_iterations} 轮" not in prompt:
             prompt += f"\n\n这是第 {iteration}/{total_iterations} 轮"
@@ -1009,6 +1228,62 @@ def _build_prompt_from_template(
         return template
 
 
+# 角色 -> (日志名称, 系统默认提示词键名, 硬编码回退函数, 回退函数所需参数)
+_ROLE_TABLE = {
+    ROLE_WRITER: (
+        "撰写者",
+        PromptKeys.PATENT_WRITER,
+        _build_writer_prompt_fallback,
+        ("context", "previous_draft", "previous_review", "iteration", "total_iterations"),
+    ),
+    ROLE_REVIEWER: (
+        "审核者",
+        PromptKeys.PATENT_REVIEWER,
+        _build_reviewer_prompt_fallback,
+        ("context", "current_draft", "iteration", "total_iterations"),
+    ),
+}
+
+
+def _get_effective_prompt(role: str, template_id: Optional[str] = None, **kwargs) -> str:
+    """
+    获取指定角色的有效提示词：优先使用用户自定义（严格模式），否则使用系统默认，
+    构建失败时回退到硬编码提示词
+
+    Args:
+        role: 角色名称（ROLE_WRITER 或 ROLE_REVIEWER）
+        template_id: 模板ID，仅用于系统默认提示词
+        **kwargs: 提示词变量（context、iteration、total_iterations 等）
+
+    Returns:
+        有效的提示词
+    """
+    label, prompt_key, fallback_fn, fallback_args = _ROLE_TABLE[role]
+    try:
+        # 优先检查用户自定义提示词
+        user_custom_prompt = _get_user_prompt(role)
+
+        # 调试日志：每轮迭代都会调用，关闭 DEBUG 时跳过全部格式化开销
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("检查用户自定义%s提示词，存在: %s", label, bool(user_custom_prompt))
+            if user_custom_prompt:
+                logger.debug("用户提示词长度: %d 字符，开头: %s...，是否为空: %s",
+                             len(user_custom_prompt), user_custom_prompt[:50],
+                             not _has_nonspace(user_custom_prompt))
+
+        if _has_nonspace(user_custom_prompt):
+            logger.info(f"使用用户自定义{label}提示词（严格模式）")
+            return _build_prompt_from_template(user_custom_prompt, strict_mode=True, **kwargs)
+        else:
+            logger.debug(f"用户未设置自定义{label}提示词，使用系统默认")
+            return get_prompt(prompt_key, template_id=template_id, **kwargs)
+
+    except Exception as e:
+        logger.error(f"获取{label}提示词失败: {e}")
+        # 回退到硬编码提示词
+        return fallback_fn(**{name: kwargs[name] for name in fallback_args})
+
+
 def get_effective_writer_prompt(
     context: str,
     previous_draft: Optional[str],
@@ -1032,50 +1307,16 @@ def get_effective_writer_prompt(
     Returns:
         有效的撰写者提示词
     """
-    try:
-        # 优先检查用户自定义提示词
-        user_prompt_manager = get_user_prompt_manager()
-        user_custom_prompt = user_prompt_manager.get_user_prompt('writer')
-
-        # 添加详细的调试日志
-        logger.info(f"检查用户自定义撰写者提示词...")
-        logger.info(f"用户提示词存在: {bool(user_custom_prompt)}")
-        if user_custom_prompt:
-            logger.info(f"用户提示词长度: {len(user_custom_prompt)} 字符")
-            logger.info(f"用户提示词开头: {user_custom_prompt[:50]}...")
-            logger.info(f"用户提示词是否为空: {not user_custom_prompt.strip()}")
-
-        if user_custom_prompt and user_custom_prompt.strip():
-            logger.info("使用用户自定义撰写者提示词（严格模式）")
-            return _build_prompt_from_template(
-                user_custom_prompt,
-                context=context,
-                previous_draft=previous_draft,
-                previous_review=previous_review,
-                iteration=iteration,
-                total_iterations=total_iterations,
-                strict_mode=True,
-                idea_text=idea_text
-            )
-        else:
-            logger.debug("用户未设置自定义撰写者提示词，使用系统默认")
-            return get_prompt(
-                PromptKeys.PATENT_WRITER,
-                context=context,
-                previous_draft=previous_draft,
-                previous_review=previous_review,
-                iteration=iteration,
-                total_iterations=total_iterations,
-                template_id=template_id,
-                idea_text=idea_text
-            )
-
-    except Exception as e:
-        logger.error(f"获取撰写者提示词失败: {e}")
-        # 回退到硬编码提示词
-        return _build_writer_prompt_fallback(
-            context, previous_draft, previous_review, iteration, total_iterations
-        )
+    return _get_effective_prompt(
+        ROLE_WRITER,
+        template_id=template_id,
+        context=context,
+        previous_draft=previous_draft,
+        previous_review=previous_review,
+        iteration=iteration,
+        total_iterations=total_iterations,
+        idea_text=idea_text
+    )
 
 
 def get_effective_reviewer_prompt(
@@ -1098,44 +1339,12 @@ def get_effective_reviewer_prompt(
     Returns:
         有效的审核者提示词
     """
-    try:
-        # 优先检查用户自定义提示词
-        user_prompt_manager = get_user_prompt_manager()
-        user_custom_prompt = user_prompt_manager.get_user_prompt('reviewer')
-
-        # 添加详细的调试日志
-        logger.info(f"检查用户自定义审核者提示词...")
-        logger.info(f"用户提示词存在: {bool(user_custom_prompt)}")
-        if user_custom_prompt:
-            logger.info(f"用户提示词长度: {len(user_custom_prompt)} 字符")
-            logger.info(f"用户提示词开头: {user_custom_prompt[:50]}...")
-            logger.info(f"用户提示词是否为空: {not user_custom_prompt.strip()}")
-
-        if user_custom_prompt and user_custom_prompt.strip():
-            logger.info("使用用户自定义审核者提示词（严格模式）")
-            return _build_prompt_from_template(
-                user_custom_prompt,
-                context=context,
-                current_draft=current_draft,
-                iteration=iteration,
-                total_iterations=total_iterations,
-                strict_mode=True
-            )
-        else:
-            logger.debug("用户未设置自定义审核者提示词，使用系统默认")
-            return get_prompt(
-                PromptKeys.PATENT_REVIEWER,
-                context=context,
-                current_draft=current_draft,
-                iteration=iteration,
-                total_iterations=total_iterations,
-                template_id=template_id
-            )
-
-    except Exception as e:
-        logger.error(f"获取审核者提示词失败: {e}")
-        # 回退到硬编码提示词
-        return _build_reviewer_prompt_fallback(
-            context, current_draft, iteration, total_iterations
-        )
+    return _get_effective_prompt(
+        ROLE_REVIEWER,
+        template_id=template_id,
+        context=context,
+        current_draft=current_draft,
+        iteration=iteration,
+        total_iterations=total_iterations
+    )
 
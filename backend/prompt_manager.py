@@ -5,20 +5,135 @@
 """
 
 import os
+import sys
+import json
+import pickle
 import yaml
 import re
 import logging
+import io
 import time
+import functools
+import mmap
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Callable
 from pathlib import Path
 from dataclasses import dataclass
 
+from config import get_config
 from template_manager import get_template_manager
 
+try:
+    # libyaml C 解析器，比纯 Python 实现快一个数量级
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 logger = logging.getLogger(__name__)
 
+# 可参与渲染缓存键的参数值类型（均为可哈希的不可变类型）
+_CACHEABLE_TYPES = (str, int, float, bool, type(None))
+
+# 超过该长度的字符串参数（草案、评审意见等）不进入渲染缓存，避免缓存长期持有大段文本
+_CACHEABLE_STR_MAX_LEN = 1024
+
+# 上下文章节占位符中的 {{变量名}}
+_VAR_RE = re.compile(r'\{\{(\w+)\}\}')
+
+_YAML_SUFFIXES = ('.yaml', '.yml')
+
+# 超过该大小的 YAML 文件通过 mmap 交给解析器按块读取，不再整体读入内存
+_YAML_MMAP_THRESHOLD = 1024 * 1024
+
+# 代码片段特征（用于检测动态生成内容中意外泄漏的代码）
+_CODE_INDICATORS = (
+    "def ", "class ", "import ", "from ", "# ", "// ", "/* ", "*/",
+    "```", "function", "var ", "let ", "const ", "=>", "{", "}",
+    "__pycache__", ".py", ".js", ".java", ".cpp", ".h"
+)
+_CODE_INDICATORS_RE = re.compile('|'.join(map(re.escape, _CODE_INDICATORS)), re.IGNORECASE)
+# 所有代码特征的首字符（含大小写）；文本中一个都没有时不可能命中，无需运行正则
+_CODE_INDICATOR_FIRST_CHARS = frozenset(
+    ch for ind in _CODE_INDICATORS for ch in (ind[0].lower(), ind[0].upper())
+)
+
+# 代码片段过滤规则
+_CODEBLOCK_RE = re.compile(r'```[\s\S]*?```')
+_FUNCDEF_RE = re.compile(r'def\s+\w+\([^)]*\):\s*\n.*?(?=\n\w|\Z)', re.MULTILINE)
+_IMPORT_RE = re.compile(r'import\s+.*\n')
+_FROM_IMPORT_RE = re.compile(r'from\s+.*\s+import.*\n')
+_LINE_COMMENT_RE = re.compile(r'#.*\n')
+_CLASSDEF_RE = re.compile(r'class\s+\w+.*?:\s*\n.*?(?=\n\w|\Z)', re.MULTILINE)
+
+
+def _include_always(kwargs: Dict[str, Any]) -> bool:
+    """无条件或未知条件的动态章节始终包含"""
+    return True
+
+
+# 动态章节条件名 -> 判断函数（参数为渲染参数字典）
+_COND_FNS: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+    'has_template_id': lambda kw: bool(kw.get('template_id')),
+    'high_complexity': lambda kw: kw.get('template_complexity', 0) > 0.7,
+    'has_domains': lambda kw: bool(kw.get('template_domains')),
+    'has_requirements': lambda kw: bool(kw.get('template_requirements')),
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _iteration_info(iteration, total_iterations) -> str:
+    """生成迭代轮次说明，常见轮次组合复用同一字符串"""
+    return f"这是第 {iteration}/{total_iterations} 轮"
+
+
+def _intern_tree(obj):
+    """驻留解析结果中的所有字符串，并将列表冻结为元组"""
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    if isinstance(obj, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: _intern_tree(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return tuple(_intern_tree(x) for x in obj)
+    return obj
+
 
-@dataclass
+def _iter_yaml_files(root: str, dir_mtimes: Optional[Dict[str, float]] = None):
+    """
+    一次遍历目录树，产出所有 .yaml / .yml 文件的 (路径字符串, 修改时间)
+
+    修改时间取自目录项的 stat 结果，每个文件只需一次系统调用；
+    路径直接使用目录项的字符串，不构造 Path 对象。
+
+    Args:
+        root: 根目录
+        dir_mtimes: 若提供，记录遍历到的每个目录的修改时间
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            if dir_mtimes is not None:
+                dir_mtimes[str(directory)] = os.stat(directory).st_mtime
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(_YAML_SUFFIXES):
+                        try:
+                            mtime = entry.stat().st_mtime
+                        except OSError:
+                            continue
+                        yield entry.path, mtime
+        except OSError as e:
+            logger.warning(f"无法读取提示词目录 {directory}: {e}")
+
+
+# Python 3.10+ 的 dataclass 支持 slots，去掉每个实例的 __dict__
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class PromptConfig:
     """提示词配置数据类"""
     name: str
@@ -31,6 +146,16 @@ class PromptConfig:
     # 增强功能：支持动态内容生成
     dynamic_generators: Optional[Dict[str, Callable]] = None
     template_analysis_cache: Optional[Dict[str, Any]] = None
+    # 加载时预先拼接的静态部分（与调用参数无关）
+    static_prefix: Optional[str] = None
+    static_suffix: Optional[str] = None
+    # 迭代阶段指令 (首轮, 后续轮)，配置未定义 iteration_phases 时为 None
+    iteration_instructions: Optional[tuple] = None
+    # 上下文章节的 str.format_map 模板，及使用该模板时必须提供（非空字符串）的变量
+    section_template: Optional[str] = None
+    section_required_vars: tuple = ()
+    # 上下文章节展开后的 (键名, 标题, 占位符, 条件, 变量名) 元组，通用构建路径直接遍历
+    section_specs: tuple = ()
 
 
 class PromptManager:
@@ -49,8 +174,35 @@ class PromptManager:
             prompts_dir = current_dir.parent / "prompts"
 
         self.prompts_dir = Path(prompts_dir)
-        self._cache: Dict[str, PromptConfig] = {}
+        # 目录的字符串形式，扫描和键名计算直接做字符串运算
+        self._prompts_root = str(self.prompts_dir)
+        # YAML 解析结果的旁路缓存（json 或 pickle）
+        prompt_settings = get_config().prompt
+        self._parse_cache_enabled = prompt_settings.parse_cache
+        self._parse_cache_format = prompt_settings.parse_cache_format
+        # 已加载配置，按最近使用顺序排列；超过上限时淘汰最久未使用的配置，下次访问时重新加载
+        self._cache: "OrderedDict[str, PromptConfig]" = OrderedDict()
+        self._max_prompts = prompt_settings.max_prompts
         self._template_cache: Dict[str, str] = {}
+        # 最近一次扫描到的 YAML 文件列表，供统计信息复用
+        self._yaml_files: List[str] = []
+        # 最近一次扫描得到的文件修改时间
+        self._file_mtimes: Dict[str, float] = {}
+        # 上次扫描时各目录的修改时间，用于判断缓存未命中时是否需要重新扫描
+        self._dir_mtimes: Dict[str, float] = {}
+        # 分类索引：分类名 -> {键名: 配置}
+        self._by_category: Dict[str, Dict[str, PromptConfig]] = {}
+        # 版本号 -> 已加载配置数
+        self._version_counts: Dict[str, int] = {}
+        # 键名 -> 配置文件路径（扫描得到，未必已加载）
+        self._index: Dict[str, str] = {}
+        # 已尝试加载但无效的键名
+        self._invalid_keys = set()
+        # 索引中的配置是否已全部加载
+        self._fully_loaded = False
+        # 渲染结果缓存：提示词是 (键名, 参数) 的纯函数，迭代中同一组参数会被重复渲染
+        render_cache_size = prompt_settings.render_cache_size if prompt_settings.cache_enabled else 0
+        self._render_cached = functools.lru_cache(maxsize=render_cache_size)(self._render_typed)
 
         # 模板管理器引用
         self._template_manager = None
@@ -63,7 +215,7 @@ class PromptManager:
         # 注册动态生成器
         self._register_dynamic_generators()
 
-        # 预加载所有提示词配置
+        # 建立提示词索引，配置在首次使用时加载
         self._load_all_prompts()
 
     def _register_dynamic_generators(self):
@@ -77,34 +229,182 @@ class PromptManager:
         return self._template_manager
 
     def _load_all_prompts(self):
-        """加载所有提示词配置文件"""
+        """
+        扫描提示词目录并建立键名索引（不解析 YAML），配置在首次访问时再加载
+
+        已加载且文件未修改的配置会保留，已修改或已删除文件对应的配置会被丢弃。
+        """
+        self._index = {}
+        self._dir_mtimes = {}
+        self._file_mtimes = {}
+        self._yaml_files = []
+        self._invalid_keys = set()
+        self._fully_loaded = False
+        # 配置即将被替换，旧的渲染结果不再有效
+        self._render_cached.cache_clear()
+
         if not self.prompts_dir.exists():
             logger.warning(f"提示词目录不存在: {self.prompts_dir}")
+            for key in list(self._cache):
+                self._drop_config(key)
             return
 
         # 递归查找所有 YAML 文件
-        yaml_files = list(self.prompts_dir.rglob("*.yaml"))
-        yaml_files.extend(list(self.prompts_dir.rglob("*.yml")))
+        self._file_mtimes = dict(_iter_yaml_files(self._prompts_root, self._dir_mtimes))
+        self._yaml_files = list(self._file_mtimes)
+        for yaml_file in self._yaml_files:
+            self._index[self._get_prompt_key(yaml_file)] = yaml_file
+
+        # 丢弃已删除或已修改文件对应的配置，下次访问时重新加载
+        for key in list(self._cache):
+            yaml_file = self._index.get(key)
+            if yaml_file is None or not self._is_unchanged(yaml_file):
+                self._drop_config(key)
+
+        logger.info(f"提示词索引完成，共发现 {len(self._index)} 个配置文件")
+
+    def _store_config(self, key: str, config: PromptConfig):
+        """写入配置缓存，并同步更新分类索引和版本计数"""
+        if key in self._cache:
+            self._drop_config(key)
+        self._cache[key] = config
+
+        # 分类索引按键名第一段（如 patent、code），仅包含点分隔的键名
+        category, sep, _ = key.partition('.')
+        if sep:
+            self._by_category.setdefault(category, {})[key] = config
+
+        self._version_counts[config.version] = self._version_counts.get(config.version, 0) + 1
+
+    def _drop_config(self, key: str):
+        """移除配置缓存，并同步更新分类索引和版本计数"""
+        config = self._cache.pop(key, None)
+        if config is None:
+            return
 
-        loaded_count = 0
-        for yaml_file in yaml_files:
-            try:
-                config = self._load_prompt_file(yaml_file)
+        category, sep, _ = key.partition('.')
+        if sep:
+            members = self._by_category.get(category)
+            if members is not None:
+                members.pop(key, None)
+                if not members:
+                    del self._by_category[category]
+
+        remaining = self._version_counts.get(config.version, 0) - 1
+        if remaining > 0:
+            self._version_counts[config.version] = remaining
+        else:
+            self._version_counts.pop(config.version, None)
+
+    def _load_key(self, key: str) -> Optional[PromptConfig]:
+        """按需加载单个提示词配置，不存在或无法加载时返回 None"""
+        config = self._cache.get(key)
+        if config is not None:
+            self._cache.move_to_end(key)
+            # 列表/统计接口会临时加载全部配置，命中时顺带收回超出上限的部分
+            self._evict_overflow()
+            return config
+
+        yaml_file = self._index.get(key)
+        if yaml_file is None or key in self._invalid_keys:
+            return None
+
+        config = self._safe_load_prompt_file(yaml_file)
+        if config is None:
+            self._invalid_keys.add(key)
+            return None
+
+        self._store_config(key, config)
+        self._evict_overflow()
+        logger.debug(f"加载提示词配置: {key} from {yaml_file}")
+        return config
+
+    def _evict_overflow(self):
+        """淘汰超出上限的最久未使用配置（文件仍在索引中，再次访问时重新加载）"""
+        if not self._max_prompts:
+            return
+        while len(self._cache) > self._max_prompts:
+            oldest = next(iter(self._cache))
+            self._drop_config(oldest)
+            self._fully_loaded = False
+            logger.debug(f"淘汰提示词配置: {oldest}")
+
+    def _ensure_all_loaded(self):
+        """确保索引中的所有配置均已加载（列表和统计接口需要完整数据）"""
+        if self._fully_loaded:
+            return
+
+        pending = [
+            (key, yaml_file) for key, yaml_file in self._index.items()
+            if key not in self._cache and key not in self._invalid_keys
+        ]
+        if pending:
+            # 各文件相互独立，并行读取和解析；结果回到当前线程后再写入缓存
+            # 单个文件时直接在当前线程加载，省去线程池开销
+            if len(pending) == 1:
+                results = [self._safe_load_prompt_file(pending[0][1])]
+            else:
+                workers = min(8, os.cpu_count() or 1, len(pending))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(self._safe_load_prompt_file, [f for _, f in pending]))
+
+            loaded_count = 0
+            for (key, yaml_file), config in zip(pending, results):
                 if config:
-                    key = self._get_prompt_key(yaml_file)
-                    self._cache[key] = config
+                    self._store_config(key, config)
                     loaded_count += 1
                     logger.debug(f"加载提示词配置: {key} from {yaml_file}")
-            except Exception as e:
-                logger.error(f"加载提示词配置失败 {yaml_file}: {e}")
+                else:
+                    self._invalid_keys.add(key)
+
+            logger.info(f"提示词配置加载完成，共加载 {loaded_count} 个配置文件")
+
+        self._fully_loaded = True
+
+    def _prompts_dir_changed(self) -> bool:
+        """判断自上次扫描以来是否有目录新增或删除了文件"""
+        if not self._dir_mtimes:
+            return True
+        for directory, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _is_unchanged(self, file_path: str) -> bool:
+        """判断文件自上次加载以来是否未被修改"""
+        config = self._cache.get(self._get_prompt_key(file_path))
+        if config is None:
+            return False
+        try:
+            return config.loaded_at == self._get_file_mtime(file_path)
+        except OSError:
+            return False
 
-        logger.info(f"提示词配置加载完成，共加载 {loaded_count} 个配置文件")
+    def _get_file_mtime(self, file_path: str) -> float:
+        """获取文件修改时间，优先使用扫描时记录的值"""
+        mtime = self._file_mtimes.get(file_path)
+        if mtime is None:
+            mtime = os.path.getmtime(file_path)
+        return mtime
+
+    def _safe_load_prompt_file(self, file_path: str) -> Optional[PromptConfig]:
+        """加载单个提示词配置文件，异常时记录日志并返回 None"""
+        try:
+            return self._load_prompt_file(file_path)
+        except Exception as e:
+            logger.error(f"加载提示词配置失败 {file_path}: {e}")
+            return None
 
-    def _load_prompt_file(self, file_path: Path) -> Optional[PromptConfig]:
+    def _load_prompt_file(self, file_path: str) -> Optional[PromptConfig]:
         """加载单个提示词配置文件"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
+            data = self._read_yaml(file_path)
+
+            # 配置加载后只读，驻留字符串以减少重复内容占用的内存
+            data = _intern_tree(data)
 
             # 验证必需的元数据
             metadata = data.get('metadata', {})
@@ -112,14 +412,36 @@ class PromptManager:
                 logger.warning(f"提示词配置缺少必需元数据: {file_path}")
                 return None
 
+            # 加载时预先提取各上下文章节的占位符变量名，渲染时无需再跑正则
+            self._extract_section_vars(data)
+            self._resolve_dynamic_generators(data)
+            static_prefix, static_suffix = self._precompute_static_sections(data)
+
+            section_template, section_required_vars = self._precompute_section_template(data)
+            section_specs = self._compile_section_specs(data)
+
+            iteration_instructions = None
+            if 'iteration_phases' in data:
+                phases = data['iteration_phases']
+                iteration_instructions = (
+                    (phases.get('first_iteration') or {}).get('instruction'),
+                    (phases.get('subsequent_iteration') or {}).get('instruction'),
+                )
+
             config = PromptConfig(
                 name=metadata['name'],
                 version=metadata['version'],
                 description=metadata['description'],
                 content=data,
                 metadata=metadata,
-                file_path=str(file_path),
-                loaded_at=os.path.getmtime(file_path)
+                file_path=file_path,
+                loaded_at=self._get_file_mtime(file_path),
+                static_prefix=static_prefix,
+                static_suffix=static_suffix,
+                iteration_instructions=iteration_instructions,
+                section_template=section_template,
+                section_required_vars=section_required_vars,
+                section_specs=section_specs
             )
 
             return config
@@ -131,13 +453,89 @@ class PromptManager:
             logger.error(f"读取文件错误 {file_path}: {e}")
             return None
 
-    def _get_prompt_key(self, file_path: Path) -> str:
+    def _read_yaml(self, file_path: str) -> Any:
+        """解析 YAML 文件；启用解析缓存时优先读取未过期的旁路缓存文件"""
+        cache_path = None
+        use_json = self._parse_cache_format == 'json'
+        if self._parse_cache_enabled:
+            cache_suffix = '.cache.json' if use_json else '.cache.pkl'
+            cache_path = file_path + cache_suffix
+            try:
+                if os.path.getmtime(cache_path) >= self._get_file_mtime(file_path):
+                    with open(cache_path, 'rb') as f:
+                        return json.load(f) if use_json else pickle.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.debug(f"解析缓存不可用，重新解析 {file_path}: {e}")
+
+        # 常规大小的文件一次读入全部字节交给 YAML 解析器，由解析器自行处理 UTF-8 解码，
+        # 避免 libyaml 按块回调 Python 的 read()；大文件映射到内存后按块解析，不复制整份内容
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= _YAML_MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = yaml.load(mm, Loader=_YamlLoader)
+            else:
+                data = yaml.load(f.read(), Loader=_YamlLoader)
+
+        if cache_path is not None:
+            try:
+                if use_json:
+                    payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                    # 日期、非字符串键等无法经 JSON 原样往返的内容不写缓存
+                    if json.loads(payload) != data:
+                        raise ValueError("解析结果无法无损转换为 JSON")
+                else:
+                    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+                temp_path = os.path.splitext(cache_path)[0] + '.tmp'
+                directory = os.path.dirname(file_path)
+                dir_unchanged = self._dir_mtimes.get(directory) == os.stat(directory).st_mtime
+                with open(temp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(temp_path, cache_path)
+                # 写入旁路缓存会改变目录 mtime，同步记录值，避免被误判为目录内容变化而全量重扫；
+                # 写入前目录已有其他变化时保留旧值，仍然触发重扫
+                if dir_unchanged:
+                    self._dir_mtimes[directory] = os.stat(directory).st_mtime
+            except Exception as e:
+                logger.debug(f"写入解析缓存失败 {cache_path}: {e}")
+
+        return data
+
+    def _extract_section_vars(self, data: Dict[str, Any]):
+        """提取每个上下文章节占位符中引用的变量名，记录在章节配置的 _var_names 字段"""
+        context_sections = data.get('context_sections') or {}
+        for section_config in context_sections.values():
+            placeholder = section_config.get('placeholder', '')
+            section_config['_var_names'] = tuple(_VAR_RE.findall(placeholder))
+
+    def _resolve_dynamic_generators(self, data: Dict[str, Any]):
+        """
+        为每个动态章节解析生成器函数和条件判断函数
+
+        分别记录在章节配置的 _generator_fn（不存在时为 None）和 _cond_fn 字段。
+        """
+        dynamic_sections = data.get('dynamic_sections') or {}
+        for section_config in dynamic_sections.values():
+            condition = section_config.get('condition')
+            section_config['_cond_fn'] = _COND_FNS.get(condition, _include_always) if condition else _include_always
+            generator_name = section_config.get('generator')
+            generator_func = self._dynamic_generators.get(generator_name) if generator_name else None
+            section_config['_generator_fn'] = generator_func if callable(generator_func) else None
+
+    def _get_prompt_key(self, file_path: str) -> str:
         """根据文件路径生成提示词键名"""
-        relative_path = file_path.relative_to(self.prompts_dir)
+        root = self._prompts_root
+        if file_path.startswith(root) and file_path[len(root):len(root) + 1] == os.sep:
+            relative_path = file_path[len(root) + 1:]
+        else:
+            relative_path = os.path.relpath(file_path, root)
         # 移除扩展名并转换为点分隔的键名
-        key_parts = list(relative_path.parts)
-        key_parts[-1] = key_parts[-1].replace('.yaml', '').replace('.yml', '')
-        return '.'.join(key_parts)
+        directory, _, file_name = relative_path.rpartition(os.sep)
+        file_name = file_name.replace('.yaml', '').replace('.yml', '')
+        if directory:
+            return directory.replace(os.sep, '.') + '.' + file_name
+        return file_name
 
     def get_prompt(self, key: str, **kwargs) -> str:
         """
@@ -153,14 +551,13 @@ class PromptManager:
         Raises:
             ValueError: 提示词不存在或变量替换失败
         """
-        if key not in self._cache:
-            # 尝试重新加载配置
-            self._load_all_prompts()
-            if key not in self._cache:
+        if self._load_key(key) is None:
+            # 仅当目录内容发生变化时才重新扫描，避免对不存在的键反复全量加载
+            if self._prompts_dir_changed():
+                self._load_all_prompts()
+            if self._load_key(key) is None:
                 raise ValueError(f"提示词配置不存在: {key}")
 
-        config = self._cache[key]
-
         try:
             # 简化模板处理 - 只保留template_id用于显示模板名称
             template_id = kwargs.get('template_id')
@@ -168,14 +565,31 @@ class PromptManager:
                 # 调试日志：记录使用的模板ID
                 logger.debug(f"使用模板: {template_id}")
 
-            # 生成提示词
-            prompt_parts = self._build_enhanced_prompt_from_config(config.content, **kwargs)
-            return '\n'.join(prompt_parts)
+            # 参数均为简短的不可变值时走渲染缓存，否则直接构建；
+            # frozenset 与参数顺序无关，免去每次排序；键中带上值的类型，
+            # 避免 1、1.0 与 True 哈希相等而命中彼此的渲染结果
+            if all(
+                isinstance(v, _CACHEABLE_TYPES)
+                and not (isinstance(v, str) and len(v) > _CACHEABLE_STR_MAX_LEN)
+                for v in kwargs.values()
+            ):
+                return self._render_cached(
+                    key, frozenset((k, type(v), v) for k, v in kwargs.items())
+                )
+            return self._render_prompt(key, tuple(kwargs.items()))
 
         except Exception as e:
             logger.error(f"构建提示词失败 {key}: {e}")
             raise ValueError(f"构建提示词失败: {str(e)}")
 
+    def _render_prompt(self, key: str, items) -> str:
+        """根据键名和参数 (名称, 值) 对集合生成提示词字符串"""
+        return self._build_prompt_from_config(self._cache[key], **dict(items))
+
+    def _render_typed(self, key: str, typed_items) -> str:
+        """渲染缓存入口：参数为 (名称, 类型, 值) 三元组集合"""
+        return self._render_prompt(key, ((k, v) for k, _, v in typed_items))
+
     def get_enhanced_prompt(self, key: str, template_id: str = None, **kwargs) -> str:
         """
         获取增强的提示词，支持模板智能分析
@@ -199,28 +613,16 @@ class PromptManager:
         logger.debug(f"模板分析功能已移除，模板ID: {template_id}")
         return {}
 
-    def _build_enhanced_prompt_from_config(self, config: Dict[str, Any], **kwargs) -> List[str]:
-        """简化的提示词构建，移除动态内容生成"""
-        # 直接使用基础构建逻辑，不再支持模板相关功能
-        return self._build_prompt_from_config(config, **kwargs)
-
     def _should_include_section(self, section_config: Dict[str, Any], **kwargs) -> bool:
         """判断是否应该包含某个动态章节"""
-        condition = section_config.get('condition')
-        if not condition:
-            return True
-
-        # 简单的条件判断
-        if condition == 'has_template_id':
-            return bool(kwargs.get('template_id'))
-        elif condition == 'high_complexity':
-            return kwargs.get('template_complexity', 0) > 0.7
-        elif condition == 'has_domains':
-            return bool(kwargs.get('template_domains'))
-        elif condition == 'has_requirements':
-            return bool(kwargs.get('template_requirements'))
-        else:
-            return True
+        cond_fn = section_config.get('_cond_fn')
+        if cond_fn is None:
+            # 未经加载预处理的章节配置，按条件名查表
+            condition = section_config.get('condition')
+            if not condition:
+                return True
+            cond_fn = _COND_FNS.get(condition, _include_always)
+        return cond_fn(kwargs)
 
     def _generate_dynamic_content(self, section_name: str, section_config: Dict[str, Any], **kwargs) -> str:
         """生成动态章节内容"""
@@ -231,17 +633,20 @@ class PromptManager:
             logger.debug(f"动态章节 {section_name} 未指定生成器")
             return ""
 
-        if generator_name not in self._dynamic_generators:
+        # 优先使用加载时解析好的生成器，未预解析的章节配置再查表
+        if '_generator_fn' in section_config:
+            generator_func = section_config['_generator_fn']
+        else:
+            generator_func = self._dynamic_generators.get(generator_name)
+        if generator_func is None:
             logger.warning(f"动态生成器不存在: {generator_name}")
             return ""
+        if not callable(generator_func):
+            logger.error(f"动态生成器不可调用: {generator_name}")
+            return ""
 
         # 安全调用生成器
         try:
-            generator_func = self._dynamic_generators[generator_name]
-            if not callable(generator_func):
-                logger.error(f"动态生成器不可调用: {generator_name}")
-                return ""
-
             result = generator_func(section_config, **kwargs)
 
             # 验证返回值类型
@@ -265,35 +670,27 @@ class PromptManager:
         if not text:
             return False
 
-        code_indicators = [
-            "def ", "class ", "import ", "from ", "# ", "// ", "/* ", "*/",
-            "```", "function", "var ", "let ", "const ", "=>", "{", "}",
-            "__pycache__", ".py", ".js", ".java", ".cpp", ".h"
-        ]
-
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in code_indicators)
+        if _CODE_INDICATOR_FIRST_CHARS.isdisjoint(text):
+            return False
+        return _CODE_INDICATORS_RE.search(text) is not None
 
     def _filter_code_snippets(self, text: str) -> str:
         """过滤文本中的代码片段"""
-        # 移除明显的代码块
-        import re
-
         # 移除代码块标记
-        text = re.sub(r'```[\s\S]*?```', '[代码块已过滤]', text)
+        text = _CODEBLOCK_RE.sub('[代码块已过滤]', text)
 
         # 移除函数定义
-        text = re.sub(r'def\s+\w+\([^)]*\):\s*\n.*?(?=\n\w|\Z)', '[函数定义已过滤]', text, flags=re.MULTILINE)
+        text = _FUNCDEF_RE.sub('[函数定义已过滤]', text)
 
         # 移除import语句
-        text = re.sub(r'import\s+.*\n', '', text)
-        text = re.sub(r'from\s+.*\s+import.*\n', '', text)
+        text = _IMPORT_RE.sub('', text)
+        text = _FROM_IMPORT_RE.sub('', text)
 
         # 移除单行注释
-        text = re.sub(r'#.*\n', '\n', text)
+        text = _LINE_COMMENT_RE.sub('\n', text)
 
         # 移除类定义
-        text = re.sub(r'class\s+\w+.*?:\s*\n.*?(?=\n\w|\Z)', '[类定义已过滤]', text, flags=re.MULTILINE)
+        text = _CLASSDEF_RE.sub('[类定义已过滤]', text)
 
         return text.strip()
 
@@ -506,12 +903,18 @@ class PromptManager:
         """模板功能已移除"""
         return ""
 
-    def _build_prompt_from_config(self, config: Dict[str, Any], **kwargs) -> List[str]:
-        """根据配置构建提示词"""
+    def _precompute_static_sections(self, content: Dict[str, Any]) -> tuple:
+        """
+        预先拼接与调用参数无关的静态部分
+
+        Returns:
+            (static_prefix, static_suffix)：角色/目标/要求/审查重点，以及最终指令；
+            配置中不存在对应内容时为 None
+        """
         parts = []
 
         # 获取提示词配置
-        prompt_config = config.get('prompt', {})
+        prompt_config = content.get('prompt', {})
 
         # 添加角色设定
         if 'role' in prompt_config:
@@ -525,45 +928,134 @@ class PromptManager:
 
         # 添加要求列表
         if 'requirements' in prompt_config:
-            if isinstance(prompt_config['requirements'], list):
+            if isinstance(prompt_config['requirements'], (list, tuple)):
                 requirements_text = '\n'.join(f"- {req}" for req in prompt_config['requirements'])
                 parts.append("整体要求：")
                 parts.append(requirements_text)
 
         # 添加审查重点（评审专用）
         if 'review_focus' in prompt_config:
-            if isinstance(prompt_config['review_focus'], list):
+            if isinstance(prompt_config['review_focus'], (list, tuple)):
                 focus_text = '\n'.join(f"- {focus}" for focus in prompt_config['review_focus'])
                 parts.append("审查重点包括但不限于：")
                 parts.append(focus_text)
 
+        static_prefix = '\n'.join(parts) if parts else None
+
+        # 最终指令
+        if 'final_instruction' in prompt_config:
+            static_suffix = prompt_config['final_instruction']
+        elif 'output_format' in prompt_config:
+            static_suffix = prompt_config['output_format']
+        else:
+            static_suffix = None
+
+        return static_prefix, static_suffix
+
+    def _precompute_section_template(self, content: Dict[str, Any]) -> tuple:
+        """
+        为上下文章节生成 str.format_map 模板
+
+        当所有占位符变量和条件变量都是非空字符串时，每个章节都会被包含，
+        输出即为固定模板填入变量值，可用一次 format_map 完成渲染。
+
+        Returns:
+            (section_template, required_vars)：无法生成模板时为 (None, ())
+        """
+        context_sections = content.get('context_sections') or {}
+        pieces = []
+        required_vars = []
+
+        for section_config in context_sections.values():
+            var_names = set(section_config.get('_var_names', ()))
+            # 多变量占位符的逐个替换存在相互影响，交给通用构建逻辑处理
+            if len(var_names) > 1 or any(name.isdigit() for name in var_names):
+                return None, ()
+
+            condition = section_config.get('condition')
+            if condition:
+                if not isinstance(condition, str) or not condition.isidentifier():
+                    return None, ()
+                required_vars.append(condition)
+
+            title = section_config['title']
+            placeholder = section_config['placeholder']
+            pieces.append(title.replace('{', '{{').replace('}', '}}'))
+            pieces.append('\n')
+            if var_names:
+                var_name = var_names.pop()
+                required_vars.append(var_name)
+                literals = placeholder.split('{{' + var_name + '}}')
+                escaped = [x.replace('{', '{{').replace('}', '}}') for x in literals]
+                pieces.append(('{' + var_name + '}').join(escaped))
+            else:
+                pieces.append(placeholder.replace('{', '{{').replace('}', '}}'))
+            pieces.append('\n\n')
+
+        return ''.join(pieces), tuple(dict.fromkeys(required_vars))
+
+    def _compile_section_specs(self, content: Dict[str, Any]) -> tuple:
+        """将上下文章节配置展开为元组，渲染时无需再逐个查字典"""
+        context_sections = content.get('context_sections') or {}
+        return tuple(
+            (
+                section_key,
+                section_config['title'],
+                section_config['placeholder'],
+                section_config.get('condition'),
+                section_config.get('_var_names', ()),
+            )
+            for section_key, section_config in context_sections.items()
+        )
+
+    def _build_prompt_from_config(self, prompt_config: PromptConfig, **kwargs) -> str:
+        """根据配置构建提示词：静态前缀 + 迭代/上下文章节 + 静态后缀"""
+        # 每段内容后紧跟换行写入同一个缓冲区，避免中间列表和二次拼接
+        buf = io.StringIO()
+        write = buf.write
+
+        if prompt_config.static_prefix is not None:
+            write(prompt_config.static_prefix)
+            write('\n')
+
         # 处理迭代阶段信息
         iteration = kwargs.get('iteration', 1)
         total_iterations = kwargs.get('total_iterations', 1)
-        iteration_info = f"这是第 {iteration}/{total_iterations} 轮"
-
-        if 'iteration_phases' in config:
-            iteration_config = config['iteration_phases']
-            if iteration == 1 and 'first_iteration' in iteration_config:
-                parts.append(iteration_info)
-                parts.append(iteration_config['first_iteration']['instruction'])
-            elif iteration > 1 and 'subsequent_iteration' in iteration_config:
-                parts.append(iteration_info)
-                parts.append(iteration_config['subsequent_iteration']['instruction'])
+        iteration_info = _iteration_info(iteration, total_iterations)
+
+        phases = prompt_config.iteration_instructions
+        if phases is not None:
+            if iteration == 1:
+                instruction = phases[0]
+            elif iteration > 1:
+                instruction = phases[1]
+            else:
+                instruction = None
+            if instruction is not None:
+                write(iteration_info)
+                write('\n')
+                write(instruction)
+                write('\n')
         else:
             # 默认迭代信息
-            parts.append(iteration_info)
+            write(iteration_info)
+            write('\n')
 
-        parts.append("")  # 空行分隔
+        write('\n')  # 空行分隔
 
         # 添加上下文章节
-        context_sections = config.get('context_sections', {})
-        for section_key, section_config in context_sections.items():
-            section_title = section_config['title']
-            placeholder = section_config['placeholder']
-
+        section_template = prompt_config.section_template
+        if section_template is not None and all(
+            isinstance(kwargs.get(name), str) and kwargs[name].strip()
+            for name in prompt_config.section_required_vars
+        ):
+            # 快速路径：所有章节都会被包含，一次 format_map 完成替换
+            write(section_template.format_map(kwargs))
+            section_specs = ()
+        else:
+            section_specs = prompt_config.section_specs
+        for section_key, section_title, placeholder, condition, var_matches in section_specs:
             # 检查条件
-            condition = section_config.get('condition')
             if condition:
                 # 对于条件渲染，需要检查对应的变量是否有值
                 condition_value = kwargs.get(condition)
@@ -571,8 +1063,7 @@ class PromptManager:
                     logger.debug(f"跳过上下文章节 {section_key}，条件 {condition} 未满足: {condition_value}")
                     continue
 
-            # 提取变量名并替换
-            var_matches = re.findall(r'\{\{(\w+)\}\}', placeholder)
+            # 替换加载时提取的变量名
             if var_matches:
                 # 替换所有占位符
                 content = placeholder
@@ -584,26 +1075,28 @@ class PromptManager:
 
                 # 如果替换后还有非空内容，则添加此章节
                 if content.strip():
-                    parts.append(section_title)
-                    parts.append(content)
-                    parts.append("")
+                    write(section_title)
+                    write('\n')
+                    write(content)
+                    write('\n\n')
                     logger.debug(f"添加上下文章节 {section_key}，长度: {len(content)}")
                 else:
                     logger.debug(f"跳过上下文章节 {section_key}，内容为空")
             else:
                 # 没有占位符，直接添加
-                parts.append(section_title)
-                parts.append(placeholder)
-                parts.append("")
+                write(section_title)
+                write('\n')
+                write(placeholder)
+                write('\n\n')
                 logger.debug(f"添加静态上下文章节 {section_key}")
 
         # 添加最终指令
-        if 'final_instruction' in prompt_config:
-            parts.append(prompt_config['final_instruction'])
-        elif 'output_format' in prompt_config:
-            parts.append(prompt_config['output_format'])
+        if prompt_config.static_suffix is not None:
+            write(prompt_config.static_suffix)
+            return buf.getvalue()
 
-        return parts
+        # 无最终指令时去掉末尾多写的换行
+        return buf.getvalue()[:-1]
 
     def get_prompt_config(self, key: str) -> Optional[PromptConfig]:
         """
@@ -615,7 +1108,7 @@ class PromptManager:
         Returns:
             提示词配置对象，如果不存在则返回 None
         """
-        return self._cache.get(key)
+        return self._load_key(key)
 
     def list_prompts(self, category: str = None) -> Dict[str, PromptConfig]:
         """
@@ -627,14 +1120,17 @@ class PromptManager:
         Returns:
             提示词配置字典
         """
+        self._ensure_all_loaded()
         if category:
+            if category in self._by_category:
+                return dict(self._by_category[category])
+            # 非完整分类名（如 "patent.writer"）时按前缀过滤
             return {k: v for k, v in self._cache.items() if k.startswith(category)}
-        return self._cache.copy()
+        return dict(self._cache)
 
     def reload_prompts(self):
-        """重新加载所有提示词配置"""
+        """重新扫描提示词目录，已修改或已删除文件的配置在下次访问时重新加载"""
         logger.info("重新加载提示词配置")
-        self._cache.clear()
         self._template_cache.clear()
         self._load_all_prompts()
 
@@ -673,30 +1169,15 @@ class PromptManager:
         Returns:
             统计信息字典
         """
+        self._ensure_all_loaded()
+        # 分类、版本计数随缓存增删同步维护，文件数复用扫描结果
         stats = {
             'total_prompts': len(self._cache),
-            'categories': {},
-            'versions': {},
-            'total_files': 0
+            'categories': {c: len(d) for c, d in self._by_category.items()},
+            'versions': dict(self._version_counts),
+            'total_files': len(self._yaml_files)
         }
 
-        for key, config in self._cache.items():
-            # 分类统计
-            parts = key.split('.')
-            if len(parts) >= 2:
-                category = parts[0]
-                stats['categories'][category] = stats['categories'].get(category, 0) + 1
-
-            # 版本统计
-            version = config.version
-            stats['versions'][version] = stats['versions'].get(version, 0) + 1
-
-        # 文件统计
-        if self.prompts_dir.exists():
-            yaml_files = list(self.prompts_dir.rglob("*.yaml"))
-            yaml_files.extend(list(self.prompts_dir.rglob("*.yml")))
-            stats['total_files'] = len(yaml_files)
-
         return stats
 
 
@@ -6,12 +6,33 @@
 """
 
 import logging
+import functools
 from typing import Optional
 from user_prompt_manager import get_user_prompt_manager
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# 默认提示词文件路径（导入时确定）
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+_PROMPT_FILES = {
+    "writer": _PROMPTS_DIR / "simple_writer_prompt.txt",
+    "reviewer": _PROMPTS_DIR / "simple_reviewer_prompt.txt",
+}
+
+
+@functools.lru_cache(maxsize=4)
+def _read_default_prompt_file(prompt_type: str) -> Optional[str]:
+    """读取默认提示词文件内容，每种类型每个进程只读一次；文件不存在时返回 None"""
+    prompt_file = _PROMPT_FILES.get(prompt_type)
+    if prompt_file is None:
+        return None
+    # 直接读取，文件不存在时由异常判断，省去单独的 exists() 检查
+    try:
+        return prompt_file.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
+
 
 class SimplePromptEngine:
     """
@@ -36,13 +57,12 @@ class SimplePromptEngine:
     def _load_default_prompt(self, prompt_type: str) -> str:
         """加载默认提示词"""
         try:
-            prompt_file = Path(__file__).parent / "prompts" / f"simple_{prompt_type}_prompt.txt"
-            if prompt_file.exists():
-                with open(prompt_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+            content = _read_default_prompt_file(prompt_type)
+            if content is not None:
                 self.logger.info(f"已加载默认{prompt_type}提示词，长度: {len(content)}")
                 return content
             else:
+                prompt_file = _PROMPT_FILES.get(prompt_type, _PROMPTS_DIR / f"simple_{prompt_type}_prompt.txt")
                 self.logger.warning(f"默认{prompt_type}提示词文件不存在: {prompt_file}")
                 return self._get_hardcoded_default_prompt(prompt_type)
         except Exception as e:
@@ -86,6 +106,38 @@ class SimplePromptEngine:
         else:
             return f"默认{prompt_type}提示词"
 
+    def _select_prompt(self, prompt_type: str, role_label: str, default_prompt: str) -> str:
+        """
+        选择最终使用的提示词：用户自定义提示词优先（100%原样），否则使用系统默认提示词
+
+        逐项诊断信息只在 DEBUG 级别输出，INFO 级别每次调用只记录一条决定。
+        """
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+
+        # 1. 检查用户自定义提示词
+        try:
+            user_prompt = self.user_prompt_manager.get_user_prompt(prompt_type)
+
+            if user_prompt and user_prompt.strip():
+                if debug_enabled:
+                    self.logger.debug("用户%s提示词检查:", role_label)
+                    self.logger.debug("  - 提示词长度: %d 字符", len(user_prompt))
+                    self.logger.debug("  - 提示词开头: %.100s...", user_prompt)
+                    self.logger.debug("  - 提示词结尾: ...%s", user_prompt[-50:])
+                self.logger.info("✅ 决定：使用用户自定义%s提示词（100%%原样），长度: %d 字符",
+                                 role_label, len(user_prompt))
+                return user_prompt  # 直接返回，不做任何修改
+
+            if debug_enabled:
+                self.logger.debug("用户未设置%s提示词", role_label)
+
+        except Exception as e:
+            self.logger.error(f"检查用户{role_label}提示词时出错: {e}")
+
+        # 2. 使用默认提示词
+        self.logger.info("✅ 决定：使用系统默认%s提示词，长度: %d 字符", role_label, len(default_prompt))
+        return default_prompt
+
     def get_writer_prompt(self, context: str, previous_draft: Optional[str] = None,
                          previous_review: Optional[str] = None, iteration: int = 1,
                          total_iterations: int = 1) -> str:
@@ -102,44 +154,7 @@ class SimplePromptEngine:
         Returns:
             str: 最终使用的撰写者提示词
         """
-        self.logger.info("=== 开始获取撰写者提示词 ===")
-
-        # 1. 检查用户自定义提示词
-        try:
-            user_prompt = self.user_prompt_manager.get_user_prompt('writer')
-
-            self.logger.info(f"用户撰写者提示词检查:")
-            self.logger.info(f"  - 提示词存在: {bool(user_prompt)}")
-
-            if user_prompt and user_prompt.strip():
-                prompt_length = len(user_prompt)
-                is_empty = not user_prompt.strip()
-
-                self.logger.info(f"  - 提示词长度: {prompt_length} 字符")
-                self.logger.info(f"  - 提示词为空: {is_empty}")
-                self.logger.info(f"  - 提示词开头: {user_prompt[:100]}...")
-                self.logger.info(f"  - 提示词结尾: ...{user_prompt[-50:]}")
-
-                if not is_empty:
-                    self.logger.info("✅ 决定：使用用户自定义撰写者提示词（100%原样）")
-                    self.logger.info(f"最终提示词长度: {prompt_length} 字符")
-                    self.logger.info("=== 撰写者提示词获取完成 ===")
-                    return user_prompt  # 直接返回，不做任何修改
-                else:
-                    self.logger.warning("用户提示词存在但为空字符串")
-            else:
-                self.logger.info("用户未设置撰写者提示词")
-
-        except Exception as e:
-            self.logger.error(f"检查用户撰写者提示词时出错: {e}")
-
-        # 2. 使用默认提示词
-        self.logger.info("✅ 决定：使用系统默认撰写者提示词")
-        final_prompt = self._default_writer_prompt
-        self.logger.info(f"默认提示词长度: {len(final_prompt)} 字符")
-        self.logger.info("=== 撰写者提示词获取完成 ===")
-
-        return final_prompt
+        return self._select_prompt('writer', '撰写者', self._default_writer_prompt)
 
     def get_reviewer_prompt(self, context: str, current_draft: str,
                            iteration: int = 1, total_iterations: int = 1) -> str:
@@ -155,46 +170,16 @@ class SimplePromptEngine:
         Returns:
             str: 最终使用的审核者提示词
         """
-        self.logger.info("=== 开始获取审核者提示词 ===")
+        return self._select_prompt('reviewer', '审核者', self._default_reviewer_prompt)
 
-        # 1. 检查用户自定义提示词
-        try:
-            user_prompt = self.user_prompt_manager.get_user_prompt('reviewer')
-
-            self.logger.info(f"用户审核者提示词检查:")
-            self.logger.info(f"  - 提示词存在: {bool(user_prompt)}")
-
-            if user_prompt and user_prompt.strip():
-                prompt_length = len(user_prompt)
-                is_empty = not user_prompt.strip()
-
-                self.logger.info(f"  - 提示词长度: {prompt_length} 字符")
-                self.logger.info(f"  - 提示词为空: {is_empty}")
-                self.logger.info(f"  - 提示词开头: {user_prompt[:100]}...")
-                self.logger.info(f"  - 提示词结尾: ...{user_prompt[-50:]}")
-
-                if not is_empty:
-                    self.logger.info("✅ 决定：使用用户自定义审核者提示词（100%原样）")
-                    self.logger.info(f"最终提示词长度: {prompt_length} 字符")
-                    self.logger.info("=== 审核者提示词获取完成 ===")
-                    return user_prompt  # 直接返回，不做任何修改
-                else:
-                    self.logger.warning("用户提示词存在但为空字符串")
-            else:
-                self.logger.info("用户未设置审核者提示词")
-
-        except Exception as e:
-            self.logger.error(f"检查用户审核者提示词时出错: {e}")
-
-        # 2. 使用默认提示词
-        self.logger.info("✅ 决定：使用系统默认审核者提示词")
-        final_prompt = self._default_reviewer_prompt
-        self.logger.info(f"默认提示词长度: {len(final_prompt)} 字符")
-        self.logger.info("=== 审核者提示词获取完成 ===")
 
-        return final_prompt
+# 全局简单提示词引擎实例
+_simple_prompt_engine: Optional[SimplePromptEngine] = None
 
 
 def get_simple_prompt_engine() -> SimplePromptEngine:
-    """获取简单提示词引擎实例"""
-    return SimplePromptEngine()
\ No newline at end of file
+    """获取全局简单提示词引擎实例（默认提示词只在首次创建时加载）"""
+    global _simple_prompt_engine
+    if _simple_prompt_engine is None:
+        _simple_prompt_engine = SimplePromptEngine()
+    return _simple_prompt_engine
\ No newline at end of file
@@ -6,11 +6,18 @@
 try:
     import os
     import sys
-    from flask import Flask, jsonify, request, send_from_directory
+    from flask import Flask, Response, jsonify, request, send_from_directory
     from datetime import datetime
     import json
-    import uuid
+    import secrets
     import time
+    import sched
+    import threading
+    from collections import Counter, OrderedDict
+    from importlib import metadata
+    from werkzeug.exceptions import NotFound
+    from werkzeug.utils import safe_join
+    from start_server import serve_app
 
     print("✓ 依赖导入成功")
 except ImportError as e:
@@ -18,33 +25,194 @@ except ImportError as e:
     print("请安装 Flask: pip install Flask")
     sys.exit(1)
 
+try:
+    # orjson 为可选依赖，直接输出 UTF-8 字节，比标准库 json 快数倍
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """使用 orjson 序列化 JSON 响应的 Flask JSON 提供者"""
+
+        def _options(self):
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return option
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(obj, default=self.default, option=self._options())
+            return self._app.response_class(body, mimetype=self.mimetype)
+
 # 创建Flask应用
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# 内存存储任务状态，按结束先后排列；超过上限时从最早一端淘汰已结束的任务
+tasks = OrderedDict()
+_MAX_TASKS = 10000
+_FINISHED_STATUSES = frozenset(("completed", "failed", "cancelled"))
+# 各状态的任务数，随状态变化增量维护，统计接口无需遍历全部任务
+status_counts = Counter()
+# 后台线程与请求线程都会修改任务表和计数
+_tasks_lock = threading.Lock()
+
+
+def _set_status(task, status):
+    """更新任务状态并同步状态计数；已结束的任务不再变更，返回是否更新成功"""
+    with _tasks_lock:
+        if task["status"] in _FINISHED_STATUSES:
+            return False
+        status_counts[task["status"]] -= 1
+        status_counts[status] += 1
+        task["status"] = status
+        return True
+
+
+def _finish_task(task_id):
+    """任务结束后移到队尾，并在任务数超过上限时淘汰最早结束的任务"""
+    with _tasks_lock:
+        if task_id in tasks:
+            tasks.move_to_end(task_id)
+        while len(tasks) > _MAX_TASKS:
+            oldest = next(iter(tasks.values()))
+            if oldest["status"] not in _FINISHED_STATUSES:
+                break
+            tasks.popitem(last=False)
+            status_counts[oldest["status"]] -= 1
+
+
+# 主页和健康检查返回的时间戳精确到秒即可，同一秒内复用格式化结果
+_ts_cache = {"t": 0.0, "s": ""}
+
+
+def _now_iso():
+    """返回按秒缓存的当前时间 ISO 字符串"""
+    now = time.time()
+    if now - _ts_cache["t"] >= 1.0:
+        _ts_cache["s"] = datetime.fromtimestamp(now).isoformat()
+        _ts_cache["t"] = now
+    return _ts_cache["s"]
+
+
+# 模拟处理阶段: (距提交的秒数, 进度, 提示信息)
+_SIMULATED_STAGES = (
+    (1, 20, "正在分析代码..."),
+    (3, 50, "正在生成专利草案..."),
+    (5, 80, "正在进行合规评审..."),
+    (6, 100, "任务完成"),
+)
+
+# 所有异步任务共用一个调度线程推进状态，而不是每个任务各占一个线程
+_scheduler_wakeup = threading.Event()
+
+
+def _scheduler_delay(timeout):
+    """调度器等待函数：有新事件加入时提前唤醒，以便重新计算最早的到期时间"""
+    _scheduler_wakeup.wait(timeout)
+    _scheduler_wakeup.clear()
+
+
+_scheduler = sched.scheduler(time.monotonic, _scheduler_delay)
+# 各任务尚未执行的阶段事件，取消任务时从调度队列中撤销
+_task_events = {}
+
+
+def _run_scheduler():
+    """调度线程主循环：执行到期事件，队列为空时等待新事件"""
+    while True:
+        _scheduler.run()
+        _scheduler_wakeup.wait()
+        _scheduler_wakeup.clear()
+
+
+threading.Thread(target=_run_scheduler, name="task-scheduler", daemon=True).start()
+
+
+def _advance_task(task_id, stage, iterations):
+    """将模拟任务推进到指定阶段"""
+    task = tasks.get(task_id)
+    # 已取消（或已结束）的任务不再推进
+    if task is None or task["status"] in _FINISHED_STATUSES:
+        return
+
+    _, progress, message = _SIMULATED_STAGES[stage]
+    if stage == 0:
+        if not _set_status(task, "running"):
+            return
+        task["startedAt"] = datetime.now().isoformat()
+    elif stage == len(_SIMULATED_STAGES) - 1:
+        output_file = f"output/patent-{datetime.now().strftime('%Y%m%d%H%M%S')}.md"
+        if not _set_status(task, "completed"):
+            return
+        _task_events.pop(task_id, None)
+        task["completedAt"] = datetime.now().isoformat()
+        task["result"] = {
+            "outputPath": output_file,
+            "iterations": iterations,
+            "lastReview": "这是一个模拟的专利评审结果。专利草案已生成，包含完整的技术方案描述、创新点分析和权利要求。"
+        }
+    task["progress"] = progress
+    task["message"] = message
+
+    if stage == len(_SIMULATED_STAGES) - 1:
+        _finish_task(task_id)
+
+
+def _json_template(payload):
+    """将除时间戳外固定不变的响应体预先序列化为 bytes 模板，%s 处填入时间戳"""
+    body = json.dumps(dict(payload, timestamp="\0"), ensure_ascii=False, separators=(',', ':'))
+    return body.replace('%', '%%').replace('"\\u0000"', '"%s"').encode('utf-8')
+
+
+_INDEX_BODY_TEMPLATE = _json_template({
+    "message": "专利生成系统后端服务",
+    "status": "running",
+    "version": "1.0.0",
+})
+_HEALTH_BODY_TEMPLATE = _json_template({
+    "status": "healthy",
+    "services": {
+        "flask": "ok",
+        "task_manager": "ok"
+    },
+})
+
+# 内容固定的错误响应体，预先序列化；每次请求只包装成新的 Response，
+# 不共享 Response 对象本身（其响应头可能在请求处理过程中被修改）
+_TASK_NOT_FOUND_BODY = json.dumps({
+    "error": "task_not_found",
+    "message": "任务不存在"
+}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+_CANCEL_FAILED_BODY = json.dumps({
+    "error": "cancel_failed",
+    "message": "任务已完成或已取消"
+}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _json_error(body, status):
+    """用预先序列化的响应体构建错误响应"""
+    return Response(body, status=status, mimetype="application/json")
 
-# 内存存储任务状态
-tasks = {}
 
 @app.route('/')
 def index():
     """主页"""
-    return jsonify({
-        "message": "专利生成系统后端服务",
-        "status": "running",
-        "version": "1.0.0",
-        "timestamp": datetime.now().isoformat()
-    })
+    return Response(_INDEX_BODY_TEMPLATE % _now_iso().encode(), mimetype="application/json")
+
 
 @app.route('/api/health')
 def health():
     """健康检查"""
-    return jsonify({
-        "status": "healthy",
-        "services": {
-            "flask": "ok",
-            "task_manager": "ok"
-        },
-        "timestamp": datetime.now().isoformat()
-    })
+    return Response(_HEALTH_BODY_TEMPLATE % _now_iso().encode(), mimetype="application/json")
+
 
 @app.route('/api/generate', methods=['POST'])
 def generate_sync():
@@ -71,15 +239,16 @@ def generate_sync():
             "message": str(e)
         }), 500
 
+
 @app.route('/api/generate/async', methods=['POST'])
 def generate_async():
     """异步专利生成"""
     try:
         data = request.get_json() or {}
-        task_id = str(uuid.uuid4())
+        task_id = secrets.token_hex(16)
 
         # 创建任务
-        tasks[task_id] = {
+        task = {
             "taskId": task_id,
             "status": "pending",
             "progress": 0,
@@ -90,44 +259,17 @@ def generate_async():
             "result": None,
             "error": None
         }
-
-        # 模拟异步处理 (实际中这里会启动后台任务)
-        def simulate_processing():
-            time.sleep(1)
-            if task_id in tasks:
-                tasks[task_id]["status"] = "running"
-                tasks[task_id]["startedAt"] = datetime.now().isoformat()
-                tasks[task_id]["progress"] = 20
-                tasks[task_id]["message"] = "正在分析代码..."
-
-            time.sleep(2)
-            if task_id in tasks:
-                tasks[task_id]["progress"] = 50
-                tasks[task_id]["message"] = "正在生成专利草案..."
-
-            time.sleep(2)
-            if task_id in tasks:
-                tasks[task_id]["progress"] = 80
-                tasks[task_id]["message"] = "正在进行合规评审..."
-
-            time.sleep(1)
-            if task_id in tasks:
-                output_file = f"output/patent-{datetime.now().strftime('%Y%m%d%H%M%S')}.md"
-                tasks[task_id]["status"] = "completed"
-                tasks[task_id]["progress"] = 100
-                tasks[task_id]["message"] = "任务完成"
-                tasks[task_id]["completedAt"] = datetime.now().isoformat()
-                tasks[task_id]["result"] = {
-                    "outputPath": output_file,
-                    "iterations": data.get('iterations', 1),
-                    "lastReview": "这是一个模拟的专利评审结果。专利草案已生成，包含完整的技术方案描述、创新点分析和权利要求。"
-                }
-
-        # 在后台启动模拟处理
-        import threading
-        thread = threading.Thread(target=simulate_processing)
-        thread.daemon = True
-        thread.start()
+        with _tasks_lock:
+            tasks[task_id] = task
+            status_counts["pending"] += 1
+
+        # 模拟异步处理 (实际中这里会启动后台任务)：各阶段交给共享的调度线程按时推进
+        iterations = data.get('iterations', 1)
+        _task_events[task_id] = [
+            _scheduler.enter(delay, 1, _advance_task, argument=(task_id, stage, iterations))
+            for stage, (delay, _, _) in enumerate(_SIMULATED_STAGES)
+        ]
+        _scheduler_wakeup.set()
 
         return jsonify({
             "ok": True,
@@ -141,72 +283,113 @@ def generate_async():
             "message": str(e)
         }), 500
 
+
 @app.route('/api/tasks/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """获取任务状态"""
     if task_id not in tasks:
-        return jsonify({
-            "error": "task_not_found",
-            "message": "任务不存在"
-        }), 404
+        return _json_error(_TASK_NOT_FOUND_BODY, 404)
 
     return jsonify(tasks[task_id])
 
+
 @app.route('/api/tasks/<task_id>/cancel', methods=['POST'])
 def cancel_task(task_id):
     """取消任务"""
     if task_id not in tasks:
-        return jsonify({
-            "error": "task_not_found",
-            "message": "任务不存在"
-        }), 404
+        return _json_error(_TASK_NOT_FOUND_BODY, 404)
 
-    if tasks[task_id]["status"] in ["completed", "failed", "cancelled"]:
-        return jsonify({
-            "error": "cancel_failed",
-            "message": "任务已完成或已取消"
-        }), 400
+    if not _set_status(tasks[task_id], "cancelled"):
+        return _json_error(_CANCEL_FAILED_BODY, 400)
+
+    # 撤销尚未执行的阶段事件
+    for event in _task_events.pop(task_id, ()):
+        try:
+            _scheduler.cancel(event)
+        except ValueError:
+            pass  # 事件已执行或正在执行
 
-    tasks[task_id]["status"] = "cancelled"
     tasks[task_id]["message"] = "任务已取消"
+    tasks[task_id]["completedAt"] = datetime.now().isoformat()
+    _finish_task(task_id)
 
     return jsonify({
         "ok": True,
         "message": "任务已取消"
     })
 
+
 @app.route('/api/tasks/statistics', methods=['GET'])
 def get_task_statistics():
     """获取任务统计"""
     stats = {
         "total_tasks": len(tasks),
-        "status_counts": {}
+        "status_counts": {status: count for status, count in status_counts.items() if count > 0}
     }
 
-    for task in tasks.values():
-        status = task["status"]
-        stats["status_counts"][status] = stats["status_counts"].get(status, 0) + 1
-
     return jsonify({
         "ok": True,
         "statistics": stats
     })
 
+# 前端静态文件目录，及已知存在的文件（相对路径，/ 分隔）：启动时扫描一次，
+# 之后新增的文件在首次请求时检查并加入
+_FRONTEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend')
+_frontend_files = set()
+# 扫描时跳过的目录（依赖和缓存目录文件众多且不会被直接访问）
+_FRONTEND_SKIP_DIRS = frozenset(('node_modules', '.git', '.vite', '.cache'))
+# 静态资源的浏览器缓存时间（秒）；index.html 不设缓存时间，仅靠 ETag/Last-Modified 协商，
+# 保证前端更新后能及时生效
+_STATIC_MAX_AGE = 3600
+
+
+def _scan_frontend_files():
+    """扫描前端目录下的所有文件"""
+    global _frontend_files
+    files = set()
+    for root, dirs, names in os.walk(_FRONTEND_DIR):
+        dirs[:] = [d for d in dirs if d not in _FRONTEND_SKIP_DIRS]
+        rel_root = os.path.relpath(root, _FRONTEND_DIR)
+        for name in names:
+            rel_path = name if rel_root == '.' else os.path.join(rel_root, name)
+            files.add(rel_path.replace(os.sep, '/'))
+    _frontend_files = files
+
+
+def _is_frontend_file(path):
+    """判断请求路径是否为前端文件；未命中缓存时检查文件是否存在（如重新构建后新增的文件）"""
+    if path in _frontend_files:
+        return True
+    full_path = safe_join(_FRONTEND_DIR, path)
+    if full_path is not None and os.path.isfile(full_path):
+        _frontend_files.add(path)
+        return True
+    return False
+
+
+_scan_frontend_files()
+
+
 @app.route('/<path:path>')
 def static_files(path):
     """静态文件服务"""
-    # 尝试从frontend目录提供静态文件
-    frontend_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend')
-    if os.path.exists(os.path.join(frontend_dir, path)):
-        return send_from_directory(frontend_dir, path)
+    # 尝试从frontend目录提供静态文件（已知文件直接发送，无需逐次检查是否存在）
+    # 均为条件请求：文件未变化时返回 304，不再读取和传输文件内容
+    if path != 'index.html' and _is_frontend_file(path):
+        try:
+            return send_from_directory(_FRONTEND_DIR, path, conditional=True, max_age=_STATIC_MAX_AGE)
+        except NotFound:
+            # 文件已被删除，移出缓存并回退到 index.html
+            _frontend_files.discard(path)
 
     # 默认返回index.html
-    return send_from_directory(frontend_dir, 'index.html')
+    return send_from_directory(_FRONTEND_DIR, 'index.html', conditional=True)
+
 
 if __name__ == "__main__":
     print("=== 专利生成系统简化服务器 ===")
     print(f"Python版本: {sys.version}")
-    print(f"Flask版本: {getattr(__import__('flask'), '__version__', 'unknown')}")
+    print(f"Flask版本: {metadata.version('flask')}")
 
     # 检查环境变量
     llm_cmd = os.getenv("LLM_CMD")
@@ -233,6 +416,6 @@ if __name__ == "__main__":
     print("-" * 50)
 
     try:
-        app.run(host=host, port=port, debug=debug, threaded=True)
+        serve_app(app, host, port, debug)
     except KeyboardInterrupt:
         print("\n服务器已停止")
\ No newline at end of file
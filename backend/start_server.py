@@ -7,6 +7,7 @@
 import sys
 import os
 
+
 def check_dependencies():
     """检查并安装依赖"""
     print("检查依赖...")
@@ -22,6 +23,7 @@ def check_dependencies():
         print("pip install Flask>=3.0.0")
         return False
 
+
 def minimal_app():
     """创建最小化的 Flask 应用用于测试"""
     try:
@@ -52,6 +54,28 @@ def minimal_app():
         print(f"创建应用失败: {e}")
         return None
 
+
+def serve_app(app, host, port, debug):
+    """
+    启动 HTTP 服务
+
+    非调试模式且安装了 waitress 时使用其生产级 WSGI 服务器（单进程多线程，
+    内存中的任务状态在所有请求间共享）；否则回退到 Flask 开发服务器。
+    """
+    if not debug:
+        try:
+            from waitress import serve
+        except ImportError:
+            serve = None
+        if serve is not None:
+            threads = int(os.getenv("SERVER_THREADS", "16"))
+            print(f"使用 waitress 服务器，线程数: {threads}")
+            serve(app, host=host, port=port, threads=threads)
+            return
+
+    app.run(host=host, port=port, debug=debug, threaded=True)
+
+
 def main():
     """主函数"""
     print("=== 专利生成系统后端启动器 ===\n")
@@ -94,7 +118,7 @@ def main():
         print(f"调试模式: {debug}")
         print("\n按 Ctrl+C 停止服务器")
 
-        app.run(host=host, port=port, debug=debug, threaded=True)
+        serve_app(app, host, port, debug)
 
     except KeyboardInterrupt:
         print("\n服务器已停止")
@@ -105,5 +129,6 @@ def main():
         traceback.print_exc()
         return 1
 
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -1,9 +1,11 @@
 import asyncio
-import uuid
+import heapq
+import queue
+import secrets
 import threading
-import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from enum import Enum
 import logging
 import json
@@ -22,6 +24,13 @@ class TaskStatus(Enum):
 class Task:
     """任务数据类"""
 
+    # 任务表可能积压大量实例，用 __slots__ 去掉每个实例的 __dict__
+    __slots__ = (
+        "task_id", "func", "args", "kwargs", "status", "result", "error",
+        "created_at", "_created_iso", "_started_at", "_started_iso",
+        "_completed_at", "_completed_iso", "progress", "message",
+    )
+
     def __init__(self, task_id: str, func: Callable, *args, **kwargs):
         self.task_id = task_id
         self.func = func
@@ -31,11 +40,31 @@ class Task:
         self.result: Optional[Any] = None
         self.error: Optional[str] = None
         self.created_at = datetime.now()
+        # 时间戳的 ISO 字符串在赋值时生成一次，状态轮询时直接复用
+        self._created_iso = self.created_at.isoformat()
         self.started_at: Optional[datetime] = None
         self.completed_at: Optional[datetime] = None
         self.progress = 0  # 进度百分比 0-100
         self.message = "任务等待中..."
 
+    @property
+    def started_at(self) -> Optional[datetime]:
+        return self._started_at
+
+    @started_at.setter
+    def started_at(self, value: Optional[datetime]) -> None:
+        self._started_at = value
+        self._started_iso = value.isoformat() if value else None
+
+    @property
+    def completed_at(self) -> Optional[datetime]:
+        return self._completed_at
+
+    @completed_at.setter
+    def completed_at(self, value: Optional[datetime]) -> None:
+        self._completed_at = value
+        self._completed_iso = value.isoformat() if value else None
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
@@ -43,9 +72,9 @@ class Task:
             "status": self.status.value,
             "progress": self.progress,
             "message": self.message,
-            "createdAt": self.created_at.isoformat(),
-            "startedAt": self.started_at.isoformat() if self.started_at else None,
-            "completedAt": self.completed_at.isoformat() if self.completed_at else None,
+            "createdAt": self._created_iso,
+            "startedAt": self._started_iso,
+            "completedAt": self._completed_iso,
             "result": self.result if self.status == TaskStatus.COMPLETED else None,
             "error": self.error if self.status == TaskStatus.FAILED else None,
         }
@@ -58,9 +87,22 @@ class TaskManager:
         self.max_workers = max_workers
         self.cleanup_interval = cleanup_interval
         self.tasks: Dict[str, Task] = {}
+        # 正在执行的任务：任务ID -> 执行线程
         self.running_tasks: Dict[str, threading.Thread] = {}
-        self._lock = threading.RLock()
+        # 等待执行的任务队列（先进先出），由固定数量的工作线程消费
+        self._queue: "queue.Queue[Optional[Task]]" = queue.Queue()
+        # 工作线程，首次提交任务时按当前 max_workers 创建；使用守护线程，
+        # 进程退出时不会等待长时间运行的任务
+        self._workers: List[threading.Thread] = []
+        # 各状态的任务数，随状态变化增量维护（需持有 _lock 修改）
+        self._status_counts = Counter({status: 0 for status in TaskStatus})
+        # 已结束任务的 (结束时间, 任务ID) 小顶堆，清理时只弹出已过期的部分
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        # 非可重入锁：持锁期间不调用会再次加锁的方法，日志输出放在锁外
+        self._lock = threading.Lock()
         self._cleanup_thread = None
+        # 停止信号：清理线程在等待期间可被立即唤醒
+        self._shutdown_event = threading.Event()
         self._running = False
         self.logger = logging.getLogger(__name__)
 
@@ -71,9 +113,11 @@ class TaskManager:
                 return
 
             self._running = True
+            self._shutdown_event.clear()
             self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
             self._cleanup_thread.start()
-            self.logger.info("任务管理器已启动")
+
+        self.logger.info("任务管理器已启动")
 
     def stop(self) -> None:
         """停止任务管理器"""
@@ -83,15 +127,30 @@ class TaskManager:
 
             self._running = False
 
-            # 取消所有运行中的任务
+            # 取消所有运行中和排队中的任务
             for task_id in list(self.running_tasks.keys()):
-                self.cancel_task(task_id)
+                self._cancel_locked(task_id)
+            if self._status_counts[TaskStatus.PENDING]:
+                for task in list(self.tasks.values()):
+                    if task.status == TaskStatus.PENDING:
+                        self._cancel_locked(task.task_id)
+
+            # 通知工作线程退出：空闲线程立即退出，忙碌线程在当前任务结束后退出；
+            # 之后再启动时使用新的队列和工作线程
+            old_queue, workers = self._queue, self._workers
+            self._queue = queue.Queue()
+            self._workers = []
+            cleanup_thread = self._cleanup_thread
+
+        for _ in workers:
+            old_queue.put(None)
 
-            # 等待清理线程结束
-            if self._cleanup_thread:
-                self._cleanup_thread.join(timeout=5)
+        # 唤醒并等待清理线程结束（不持锁，清理线程需要获取锁）
+        self._shutdown_event.set()
+        if cleanup_thread:
+            cleanup_thread.join(timeout=5)
 
-            self.logger.info("任务管理器已停止")
+        self.logger.info("任务管理器已停止")
 
     def submit_task(self, func: Callable, *args, **kwargs) -> str:
         """
@@ -105,17 +164,22 @@ class TaskManager:
         Returns:
             任务ID
         """
-        task_id = str(uuid.uuid4())
+        task_id = secrets.token_hex(16)
         task = Task(task_id, func, *args, **kwargs)
 
         with self._lock:
             self.tasks[task_id] = task
+            self._status_counts[task.status] += 1
 
-            # 如果有空闲的工作线程，立即启动任务
-            if len(self.running_tasks) < self.max_workers:
-                self._start_task(task)
-            else:
-                self.logger.info(f"任务 {task_id} 已加入队列，当前运行任务数: {len(self.running_tasks)}")
+            # 放入任务队列，工作线程都忙时按提交顺序等待
+            self._ensure_workers()
+            self._queue.put(task)
+            active_count = self._status_counts[TaskStatus.PENDING] + self._status_counts[TaskStatus.RUNNING]
+            queued = active_count > self.max_workers
+            running_count = len(self.running_tasks)
+
+        if queued:
+            self.logger.info(f"任务 {task_id} 已加入队列，当前运行任务数: {running_count}")
 
         return task_id
 
@@ -144,104 +208,118 @@ class TaskManager:
             是否成功取消
         """
         with self._lock:
-            task = self.tasks.get(task_id)
-            if not task:
-                return False
-
-            if task.status == TaskStatus.PENDING:
-                task.status = TaskStatus.CANCELLED
-                task.message = "任务已取消"
-                task.completed_at = datetime.now()
-                return True
-            elif task.status == TaskStatus.RUNNING:
-                # 注意：这里只是标记为取消，实际的线程可能无法立即停止
-                task.status = TaskStatus.CANCELLED
-                task.message = "任务取消中..."
-                return True
+            return self._cancel_locked(task_id)
 
+    def _cancel_locked(self, task_id: str) -> bool:
+        """取消任务（调用方需持有 _lock）"""
+        task = self.tasks.get(task_id)
+        if not task:
             return False
 
-    def _start_task(self, task: Task) -> None:
-        """启动任务执行"""
-        def task_wrapper():
-            try:
-                # 更新任务状态
-                with self._lock:
-                    task.status = TaskStatus.RUNNING
-                    task.started_at = datetime.now()
-                    task.message = "任务执行中..."
-                    task.progress = 10
-
-                # 执行任务函数
-                self.logger.info(f"开始执行任务 {task.task_id}")
-
-                # 创建带进度回调的kwargs
-                task_kwargs = dict(task.kwargs)
-                progress_callback = lambda progress, message: self._update_task_progress(task.task_id, progress, message)
-                task_kwargs['progress_callback'] = progress_callback
-
-                result = task.func(*task.args, **task_kwargs)
-
-                # 任务完成
-                with self._lock:
-                    task.status = TaskStatus.COMPLETED
-                    task.result = result
-                    task.completed_at = datetime.now()
-                    task.progress = 100
-                    task.message = "任务完成"
-
-                self.logger.info(f"任务 {task.task_id} 执行成功")
-
-            except Exception as e:
-                # 任务失败
-                with self._lock:
-                    task.status = TaskStatus.FAILED
-                    task.error = str(e)
-                    task.completed_at = datetime.now()
-                    task.message = f"任务失败: {str(e)}"
-
-                self.logger.error(f"任务 {task.task_id} 执行失败: {str(e)}", exc_info=True)
+        if task.status == TaskStatus.PENDING:
+            self._set_status(task, TaskStatus.CANCELLED)
+            task.message = "任务已取消"
+            # 任务仍留在队列中，工作线程取到后发现已取消会直接跳过
+            task.completed_at = datetime.now()
+            self._push_expiry(task)
+            return True
+        elif task.status == TaskStatus.RUNNING:
+            # 注意：这里只是标记为取消，实际的线程可能无法立即停止
+            self._set_status(task, TaskStatus.CANCELLED)
+            task.message = "任务取消中..."
+            return True
+
+        return False
+
+    def _set_status(self, task: Task, status: TaskStatus) -> None:
+        """更新任务状态并同步状态计数（调用方需持有 _lock）"""
+        self._status_counts[task.status] -= 1
+        self._status_counts[status] += 1
+        task.status = status
+
+    def _push_expiry(self, task: Task) -> None:
+        """记录已结束任务的结束时间，供过期清理使用（调用方需持有 _lock）"""
+        heapq.heappush(self._expiry_heap, (task.completed_at, task.task_id))
+
+    def _ensure_workers(self) -> None:
+        """按 max_workers 启动工作线程（调用方需持有 _lock）"""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(self._queue,),
+                name=f"task-worker-{len(self._workers)}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker_loop(self, task_queue: "queue.Queue[Optional[Task]]") -> None:
+        """工作线程：依次从队列取出任务执行，取到 None 时退出"""
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            self._run_task(task)
+
+    def _run_task(self, task: Task) -> None:
+        """在工作线程中执行任务"""
+        try:
+            # 更新任务状态
+            with self._lock:
+                if task.status != TaskStatus.PENDING:
+                    # 排队期间已被取消
+                    return
+                self.running_tasks[task.task_id] = threading.current_thread()
+                self._set_status(task, TaskStatus.RUNNING)
+                task.started_at = datetime.now()
+                task.message = "任务执行中..."
+                task.progress = 10
+
+            # 执行任务函数
+            self.logger.info(f"开始执行任务 {task.task_id}")
+
+            # 创建带进度回调的kwargs
+            task_kwargs = dict(task.kwargs)
+            progress_callback = lambda progress, message: self._update_task_progress(task.task_id, progress, message)
+            task_kwargs['progress_callback'] = progress_callback
+
+            result = task.func(*task.args, **task_kwargs)
+
+            # 任务完成
+            with self._lock:
+                self._set_status(task, TaskStatus.COMPLETED)
+                task.result = result
+                task.completed_at = datetime.now()
+                self._push_expiry(task)
+                task.progress = 100
+                task.message = "任务完成"
 
-            finally:
-                # 从运行任务列表中移除
-                with self._lock:
-                    self.running_tasks.pop(task.task_id, None)
+            self.logger.info(f"任务 {task.task_id} 执行成功")
 
-                    # 检查是否有待执行的任务
-                    self._process_pending_tasks()
+        except Exception as e:
+            # 任务失败
+            with self._lock:
+                self._set_status(task, TaskStatus.FAILED)
+                task.error = str(e)
+                task.completed_at = datetime.now()
+                self._push_expiry(task)
+                task.message = f"任务失败: {str(e)}"
 
-        # 启动线程
-        thread = threading.Thread(target=task_wrapper, daemon=True)
-        with self._lock:
-            self.running_tasks[task.task_id] = thread
+            self.logger.error(f"任务 {task.task_id} 执行失败: {str(e)}", exc_info=True)
 
-        thread.start()
+        finally:
+            # 从运行任务列表中移除
+            with self._lock:
+                self.running_tasks.pop(task.task_id, None)
 
     def _update_task_progress(self, task_id: str, progress: int, message: str) -> None:
         """更新任务进度"""
-        with self._lock:
-            task = self.tasks.get(task_id)
-            if task and task.status == TaskStatus.RUNNING:
-                task.progress = max(0, min(100, progress))
-                task.message = message
-
-    def _process_pending_tasks(self) -> None:
-        """处理待执行的任务"""
-        # 找到最早创建的待执行任务
-        pending_tasks = [
-            task for task in self.tasks.values()
-            if task.status == TaskStatus.PENDING
-        ]
-
-        pending_tasks.sort(key=lambda t: t.created_at)
-
-        # 启动可以执行的任务
-        while (len(self.running_tasks) < self.max_workers and
-               pending_tasks and
-               self._running):
-
-            task = pending_tasks.pop(0)
-            self._start_task(task)
+        # 进度回调很频繁，不加锁：单个属性赋值在 GIL 下是原子的，
+        # 且回调与完成状态的写入都发生在同一个执行线程中
+        task = self.tasks.get(task_id)
+        if task and task.status == TaskStatus.RUNNING:
+            task.progress = max(0, min(100, progress))
+            task.message = message
 
     def _cleanup_worker(self) -> None:
         """清理过期任务的 worker 线程"""
@@ -250,23 +328,28 @@ class TaskManager:
                 current_time = datetime.now()
                 expired_threshold = current_time - timedelta(hours=24)  # 24小时过期
 
+                expired_tasks = []
                 with self._lock:
-                    expired_tasks = [
-                        task_id for task_id, task in self.tasks.items()
-                        if (task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED] and
-                            task.completed_at and task.completed_at < expired_threshold)
-                    ]
-
-                    for task_id in expired_tasks:
-                        self.tasks.pop(task_id, None)
-                        self.logger.debug(f"清理过期任务: {task_id}")
-
-                # 等待下次清理
-                time.sleep(self.cleanup_interval)
+                    # 堆顶是最早结束的任务，只需弹出已过期的部分
+                    heap = self._expiry_heap
+                    while heap and heap[0][0] < expired_threshold:
+                        _, task_id = heapq.heappop(heap)
+                        task = self.tasks.pop(task_id, None)
+                        if task is not None:
+                            self._status_counts[task.status] -= 1
+                            expired_tasks.append(task_id)
+
+                for task_id in expired_tasks:
+                    self.logger.debug(f"清理过期任务: {task_id}")
+
+                # 等待下次清理，收到停止信号时立即退出
+                if self._shutdown_event.wait(self.cleanup_interval):
+                    break
 
             except Exception as e:
                 self.logger.error(f"任务清理失败: {str(e)}", exc_info=True)
-                time.sleep(60)  # 出错时等待1分钟再重试
+                if self._shutdown_event.wait(60):  # 出错时等待1分钟再重试
+                    break
 
     def get_statistics(self) -> Dict[str, Any]:
         """获取任务统计信息"""
@@ -275,13 +358,9 @@ class TaskManager:
                 "total_tasks": len(self.tasks),
                 "running_tasks": len(self.running_tasks),
                 "max_workers": self.max_workers,
-                "status_counts": {}
+                "status_counts": {status.value: self._status_counts[status] for status in TaskStatus}
             }
 
-            for status in TaskStatus:
-                count = sum(1 for task in self.tasks.values() if task.status == status)
-                stats["status_counts"][status.value] = count
-
             return stats
 
 
@@ -5,18 +5,73 @@
 为专利生成智能体提供详细的模板指导信息。
 """
 
+import os
 import re
+import bisect
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import functools
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 from docx import Document
 from docx.shared import Pt
 from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml.ns import qn
+from docx.oxml.simpletypes import ST_HpsMeasure
 
 logger = logging.getLogger(__name__)
 
+# 按字号推断标题级别：字号阈值（磅）及落入各区间时对应的标题级别
+# (<12: 非标题, 12-14: 4 级, 14-16: 3 级, 16-20: 2 级, >=20: 1 级)
+_HEADING_FONT_THRESHOLDS = (12, 14, 16, 20)
+_HEADING_LEVELS_BY_FONT = (0, 4, 3, 2, 1)
+
+# 完整专利模板必须包含的章节类型
+_REQUIRED_SECTIONS = frozenset({'标题', '技术领域', '背景技术', '发明内容', '权利要求书', '摘要'})
+
+# 标准化评分检查的规范用语
+_STANDARD_PATTERNS = ('权利要求', '附图说明', '具体实施方式')
+
+# 批量分析时启用进程池的最少待分析模板数：spawn 启动工作进程约需数百毫秒，
+# 而单个模板分析仅需十几毫秒，批量较小时串行分析更快
+_PARALLEL_MIN_TEMPLATES = 32
+
+
+def _literal_alternatives(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    将形如 '(甲|乙|丙)' 的纯字面量交替模式拆分为关键词元组
+
+    Returns:
+        Optional[Tuple[str, ...]]: 关键词元组；模式包含其他正则语法时返回 None
+    """
+    body = pattern
+    if body.startswith('(') and body.endswith(')'):
+        body = body[1:-1]
+    keywords = tuple(body.split('|'))
+    if all(keyword and re.escape(keyword) == keyword for keyword in keywords):
+        return keywords
+    return None
+
+
+# 直接遍历文档 XML 时使用的 WordprocessingML 标签和属性名
+_W_P = qn('w:p')
+_W_PPR = qn('w:pPr')
+_W_PSTYLE = qn('w:pStyle')
+_W_JC = qn('w:jc')
+_W_R = qn('w:r')
+_W_RPR = qn('w:rPr')
+_W_RFONTS = qn('w:rFonts')
+_W_SZ = qn('w:sz')
+_W_T = qn('w:t')
+_W_TAB = qn('w:tab')
+_W_BREAKS = (qn('w:br'), qn('w:cr'))
+_W_VAL = qn('w:val')
+_W_ASCII = qn('w:ascii')
+
 
 @dataclass
 class TemplateStructure:
@@ -80,9 +135,57 @@ class TemplateAnalysis:
     file_path: str
 
 
+class LazyTemplateAnalysis(TemplateAnalysis):
+    """intelligence 在首次访问时才计算的模板分析结果"""
+
+    def __init__(self, intelligence_factory: Callable[[], TemplateIntelligence], **kwargs):
+        self._intelligence_factory = intelligence_factory
+        super().__init__(intelligence=None, **kwargs)
+
+    @property
+    def intelligence(self) -> TemplateIntelligence:
+        if self._intelligence is None and self._intelligence_factory is not None:
+            self._intelligence = self._intelligence_factory()
+            self._intelligence_factory = None  # 释放对文档文本等中间结果的引用
+        return self._intelligence
+
+    @intelligence.setter
+    def intelligence(self, value: TemplateIntelligence):
+        self._intelligence = value
+
+    def __getstate__(self):
+        # 序列化前先完成智能分析，工厂函数引用了分析器，不随结果一起序列化
+        intelligence = self.intelligence
+        state = self.__dict__.copy()
+        state['_intelligence'] = intelligence
+        state['_intelligence_factory'] = None
+        return state
+
+
+@dataclass
+class ParagraphInfo:
+    """单次遍历文档时提取的段落信息"""
+    text: str  # 去除首尾空白后的文本
+    style_name: str  # 段落样式名称
+    alignment: Any  # 段落对齐方式
+    has_runs: bool  # 是否包含 run
+    font_name: Optional[str]  # 首个 run 的字体名称
+    font_size: Optional[float]  # 首个 run 的字号（磅）
+    max_font_size: float  # 所有 run 中的最大字号（磅）
+
+
 class TemplateAnalyzer:
     """模板智能分析器"""
 
+    # 段落对齐方式名称
+    _ALIGNMENT_NAMES = {
+        WD_PARAGRAPH_ALIGNMENT.LEFT: '左对齐',
+        WD_PARAGRAPH_ALIGNMENT.CENTER: '居中',
+        WD_PARAGRAPH_ALIGNMENT.RIGHT: '右对齐',
+        WD_PARAGRAPH_ALIGNMENT.JUSTIFY: '两端对齐',
+        WD_PARAGRAPH_ALIGNMENT.DISTRIBUTE: '分散对齐'
+    }
+
     def __init__(self):
         # 预定义的专利章节模式
         self.patent_section_patterns = {
@@ -96,13 +199,14 @@ class TemplateAnalyzer:
             '摘要': r'(摘要|技术摘要|内容摘要|发明摘要)'
         }
 
-        # 占位符模式
-        self.placeholder_patterns = [
-            r'\{\{\s*([^}]+)\s*\}\}',  # {{placeholder}}
-            r'\{\s*([^}]+)\s*\}',      # {placeholder}
-            r'<\s*([^>]+)\s*>',        # <placeholder>
-            r'\[\s*([^\]]+)\s*\]'      # [placeholder]
-        ]
+        # 占位符模式：四种写法合并为一个交替正则，单次扫描即可提取；
+        # {{...}} 放在最前面，避免被 {...} 抢先匹配
+        self._placeholder_re = re.compile(
+            r'\{\{\s*(?P<double_brace>[^}]+?)\s*\}\}'  # {{placeholder}}
+            r'|\{\s*(?P<brace>[^}]+?)\s*\}'            # {placeholder}
+            r'|<\s*(?P<angle>[^>]+?)\s*>'              # <placeholder>
+            r'|\[\s*(?P<bracket>[^\]]+?)\s*\]'         # [placeholder]
+        )
 
         # 字体大小映射
         self.font_size_mapping = {
@@ -122,7 +226,88 @@ class TemplateAnalyzer:
             '人工智能': ['人工智能', 'AI', '机器学习', '深度学习', '神经网络', '算法']
         }
 
-    def analyze_template(self, template_path: str, template_id: str, template_name: str) -> TemplateAnalysis:
+        # 风格指示词
+        self.style_indicators = {
+            '正式': ['正式', '规范', '标准', '严格'],
+            '简洁': ['简洁', '精炼', '简明', '概括'],
+            '详细': ['详细', '具体', '详尽', '完整'],
+            '技术性': ['技术', '专业', '术语', '规范']
+        }
+
+        # 术语规范相关词
+        self.terminology_terms = ['专业', '术语', '标准', '规范', '规定']
+
+        # 字数要求模式：合并为一个带命名分组的正则，单次扫描
+        self._word_limit_re = re.compile(r'''
+            (?P<range>(?P<low>\d+)\s*[-~～]\s*(?P<high>\d+)\s*个?字)  # 200-500字 / 10~20个字
+            | 不少于\s*(?P<min>\d+)\s*个?字                          # 不少于300字
+            | 不超过\s*(?P<max>\d+)\s*个?字                          # 不超过500字
+            | (?P<limit>\d+)\s*个?字                                 # 300字
+        ''', re.VERBOSE)
+
+        # 图表格式关键词
+        self.figure_format_keywords = {
+            '流程图': ['流程图', '流程', 'flow'],
+            '结构图': ['结构图', '结构', 'structure'],
+            '示意图': ['示意图', '示意', 'diagram'],
+            '框图': ['框图', '框图', 'block'],
+            '表格': ['表格', '表', 'table']
+        }
+
+        # 图表编号模式
+        self.numbering_patterns = [
+            (r'图\s*(\d+)', '数字编号'),
+            (r'图\s*(\d+)[-.](\d+)', '层级编号'),
+            (r'Figure\s*(\d+)', '英文编号'),
+            (r'Fig\.?\s*(\d+)', '缩写编号')
+        ]
+
+        # 预编译正则，避免每次调用都经过 re 模块的模式缓存
+        # 图表格式：所有格式合并为一个命名分组正则（分组名即格式名），单次扫描；
+        # 放在零宽先行断言中，不同格式的关键词相互重叠时也都能识别
+        self._figure_format_re = re.compile('(?=(?:' + '|'.join(
+            f"(?P<{format_type}>" + '|'.join(re.escape(k) for k in dict.fromkeys(keywords)) + ')'
+            for format_type, keywords in self.figure_format_keywords.items()
+        ) + '))')
+        # 章节类型识别：纯字面量交替的模式拆成关键词做子串匹配，其余模式仍用正则
+        self._section_matchers = []
+        for section_type, pattern in self.patent_section_patterns.items():
+            keywords = _literal_alternatives(pattern)
+            if keywords is not None:
+                self._section_matchers.append((section_type, tuple(k.lower() for k in keywords), None))
+            else:
+                self._section_matchers.append((section_type, None, re.compile(pattern, re.IGNORECASE)))
+
+        # 标题恰好是某个关键词时直接查表（按完整规则预先计算，结果与逐个匹配一致）
+        self._section_literal_map: Dict[str, str] = {}
+        literal_map = {
+            keyword: self._identify_section_type(keyword)
+            for _, keywords, _ in self._section_matchers
+            for keyword in keywords or ()
+        }
+        self._section_literal_map = literal_map
+        self._numbering_patterns_compiled = [
+            (re.compile(pattern), rule_type) for pattern, rule_type in self.numbering_patterns
+        ]
+
+        # 领域关键词、风格指示词和术语规范词合并为一个正则，单次扫描统计所有关键词出现次数；
+        # 使用零宽先行断言以允许不同关键词的匹配相互重叠，与逐个 str.count 结果一致
+        all_keywords = {
+            keyword
+            for keyword_groups in (self.domain_keywords, self.style_indicators)
+            for keywords in keyword_groups.values()
+            for keyword in keywords
+        }
+        all_keywords.update(self.terminology_terms)
+        self._keyword_re = re.compile(
+            '(?=(' + '|'.join(re.escape(k) for k in sorted(all_keywords, key=len, reverse=True)) + '))'
+        )
+
+        # 分析结果缓存，键为 (模板ID, 文件修改时间, 文件大小)，文件变化后自动失效
+        self._cache: Dict[Tuple[str, float, int], TemplateAnalysis] = {}
+
+    def analyze_template(self, template_path: str, template_id: str, template_name: str,
+                         use_cache: bool = True, eager: bool = False) -> TemplateAnalysis:
         """
         分析模板文件并返回完整的分析结果
 
@@ -130,6 +315,8 @@ class TemplateAnalyzer:
             template_path: 模板文件路径
             template_id: 模板ID
             template_name: 模板名称
+            use_cache: 文件未变化时是否直接返回缓存的分析结果
+            eager: 是否立即执行智能分析；默认在首次访问 intelligence 时才计算
 
         Returns:
             TemplateAnalysis: 完整的模板分析结果
@@ -137,31 +324,54 @@ class TemplateAnalyzer:
         import time
         start_time = time.time()
 
+        cache_key = self._get_cache_key(template_path, template_id)
+        if use_cache and cache_key in self._cache:
+            logger.debug(f"使用缓存的模板分析结果: {template_name} ({template_id})")
+            analysis = self._cache[cache_key]
+            if eager:
+                analysis.intelligence  # 触发延迟的智能分析
+            return analysis
+
         try:
             logger.info(f"开始分析模板: {template_name} ({template_id})")
 
             # 加载文档
             doc = Document(template_path)
 
+            # 只遍历一次文档段落，各分析器共享提取结果
+            paragraphs = self._collect_paragraphs(doc)
+            all_text = '\n'.join(p.text for p in paragraphs)
+
             # 分析各个维度
-            structure = self._analyze_structure(doc)
-            formatting = self._analyze_formatting(doc)
-            content_requirements = self._analyze_content_requirements(doc, template_name)
-            figure_requirements = self._analyze_figure_requirements(doc)
-            intelligence = self._analyze_intelligence(doc, structure, content_requirements)
+            structure = self._analyze_structure(paragraphs)
+            formatting = self._analyze_formatting(paragraphs)
+            content_requirements = self._analyze_content_requirements(all_text, template_name)
+            figure_requirements = self._analyze_figure_requirements(all_text)
 
             # 创建分析结果
-            analysis = TemplateAnalysis(
+            result_fields = dict(
                 template_id=template_id,
                 template_name=template_name,
                 structure=structure,
                 formatting=formatting,
                 content_requirements=content_requirements,
                 figure_requirements=figure_requirements,
-                intelligence=intelligence,
                 analyzed_at=time.time(),
                 file_path=template_path
             )
+            if eager:
+                intelligence = self._analyze_intelligence(all_text, structure, content_requirements)
+                analysis = TemplateAnalysis(intelligence=intelligence, **result_fields)
+            else:
+                # 智能分析（关键词统计、评分）推迟到首次访问 intelligence 时执行
+                analysis = LazyTemplateAnalysis(
+                    intelligence_factory=functools.partial(
+                        self._analyze_intelligence, all_text, structure, content_requirements
+                    ),
+                    **result_fields
+                )
+
+            self._store_in_cache(cache_key, analysis)
 
             analysis_time = time.time() - start_time
             logger.info(f"模板分析完成: {template_name}, 耗时: {analysis_time:.2f}秒")
@@ -172,20 +382,198 @@ class TemplateAnalyzer:
             logger.error(f"模板分析失败: {template_name}, 错误: {str(e)}")
             raise
 
-    def _analyze_structure(self, doc: Document) -> TemplateStructure:
+    def analyze_templates(self, items: List[Tuple[str, str, str]], use_cache: bool = True,
+                          max_workers: Optional[int] = None) -> List[Optional[TemplateAnalysis]]:
+        """
+        批量分析多个模板
+
+        未命中缓存的模板较多时分配到进程池中并行分析（分析是纯 Python 的 CPU 密集型计算，
+        线程受 GIL 限制无法并行），否则串行分析；结果写回本实例的缓存。
+
+        Args:
+            items: (模板文件路径, 模板ID, 模板名称) 列表
+            use_cache: 文件未变化时是否直接使用缓存的分析结果
+            max_workers: 最大进程数，默认为 CPU 核数
+
+        Returns:
+            List[Optional[TemplateAnalysis]]: 与 items 顺序一致的分析结果，分析失败的项为 None
+        """
+        results: List[Optional[TemplateAnalysis]] = [None] * len(items)
+        pending = []
+
+        for index, (template_path, template_id, template_name) in enumerate(items):
+            cache_key = self._get_cache_key(template_path, template_id)
+            if use_cache and cache_key in self._cache:
+                results[index] = self._cache[cache_key]
+            else:
+                pending.append((index, cache_key))
+
+        if not pending:
+            return results
+
+        workers = min(max_workers or os.cpu_count() or 1, len(pending))
+        if workers < 2 or len(pending) < _PARALLEL_MIN_TEMPLATES:
+            # 模板较少或只有单核时进程池的启动开销得不偿失，直接串行分析
+            for index, _ in pending:
+                try:
+                    results[index] = self.analyze_template(*items[index], use_cache=False)
+                except Exception:
+                    pass  # analyze_template 已记录错误
+            return results
+
+        logger.info(f"并行分析 {len(pending)} 个模板，进程数: {workers}")
+
+        # 使用 spawn 启动工作进程：服务进程中有多个线程，fork 可能复制到被其他线程持有的锁
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [
+                (index, cache_key, executor.submit(_analyze_template_in_worker, *items[index]))
+                for index, cache_key in pending
+            ]
+            for index, cache_key, future in futures:
+                try:
+                    analysis = future.result()
+                except Exception as e:
+                    logger.error(f"模板分析失败: {items[index][2]}, 错误: {str(e)}")
+                    continue
+                self._store_in_cache(cache_key, analysis)
+                results[index] = analysis
+
+        return results
+
+    def _get_cache_key(self, template_path: str, template_id: str) -> Optional[Tuple[str, float, int]]:
+        """根据文件修改时间和大小生成缓存键，文件不可访问时返回 None"""
+        try:
+            stat = os.stat(template_path)
+        except OSError:
+            return None
+        return (template_id, stat.st_mtime, stat.st_size)
+
+    def _store_in_cache(self, cache_key: Optional[Tuple[str, float, int]], analysis: TemplateAnalysis):
+        """保存分析结果到缓存"""
+        if cache_key is None:
+            return
+
+        # 模板文件更新后旧条目不再命中，一并清理
+        template_id = cache_key[0]
+        for key in [k for k in self._cache if k[0] == template_id]:
+            del self._cache[key]
+        self._cache[cache_key] = analysis
+
+    def _collect_paragraphs(self, doc: Document) -> List[ParagraphInfo]:
+        """
+        遍历一次文档，提取后续分析所需的段落信息（跳过空段落）
+
+        直接读取底层 XML 元素，不再为每个段落/run 创建 python-docx 的
+        Paragraph、Run、Font 包装对象；文本、样式、对齐和字体的取值规则
+        与 python-docx 保持一致。
+        """
+        style_names, default_style_name = self._paragraph_style_names(doc)
+        paragraphs = []
+
+        for p in doc.element.body.iterchildren(_W_P):
+            runs = list(p.iterchildren(_W_R))
+
+            # 段落文本：与 Paragraph.text 相同，拼接各 run 的 w:t / w:tab / w:br / w:cr
+            texts = []
+            for r in runs:
+                for child in r:
+                    tag = child.tag
+                    if tag == _W_T:
+                        texts.append(child.text or '')
+                    elif tag == _W_TAB:
+                        texts.append('\t')
+                    elif tag in _W_BREAKS:
+                        texts.append('\n')
+            text = ''.join(texts).strip()
+            if not text:
+                continue
+
+            # 段落样式和对齐方式
+            style_name = default_style_name
+            alignment = None
+            pPr = p.find(_W_PPR)
+            if pPr is not None:
+                pStyle = pPr.find(_W_PSTYLE)
+                if pStyle is not None:
+                    style_name = style_names.get(pStyle.get(_W_VAL), default_style_name)
+                jc = pPr.find(_W_JC)
+                if jc is not None and jc.get(_W_VAL):
+                    alignment = WD_PARAGRAPH_ALIGNMENT.from_xml(jc.get(_W_VAL))
+
+            # run 字体：首个 run 的字体名称/字号，以及所有 run 的最大字号
+            font_name = None
+            font_size = None
+            max_font_size = 0
+            for index, r in enumerate(runs):
+                name = None
+                size = None
+                rPr = r.find(_W_RPR)
+                if rPr is not None:
+                    rFonts = rPr.find(_W_RFONTS)
+                    if rFonts is not None:
+                        name = rFonts.get(_W_ASCII)
+                    sz = rPr.find(_W_SZ)
+                    if sz is not None and sz.get(_W_VAL):
+                        size = ST_HpsMeasure.convert_from_xml(sz.get(_W_VAL)).pt
+                if size:
+                    max_font_size = max(max_font_size, size)
+                if index == 0:
+                    font_name = name
+                    font_size = size
+                if max_font_size >= _HEADING_FONT_THRESHOLDS[-1]:
+                    # 已达到最高级别标题字号，无需继续检查其余 run
+                    break
+
+            paragraphs.append(ParagraphInfo(
+                text=text,
+                style_name=style_name,
+                alignment=alignment,
+                has_runs=bool(runs),
+                font_name=font_name,
+                font_size=font_size,
+                max_font_size=max_font_size
+            ))
+
+        return paragraphs
+
+    def _paragraph_style_names(self, doc: Document) -> Tuple[Dict[str, str], str]:
+        """
+        构建样式ID到段落样式名称的映射
+
+        与 python-docx 的解析规则一致：样式ID不存在或不是段落样式时使用默认段落样式。
+
+        Returns:
+            Tuple[Dict[str, str], str]: (样式ID -> 样式名称, 默认段落样式名称)
+        """
+        styles = doc.styles
+        default_style = styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_style_name = default_style.name if default_style is not None else 'Normal'
+
+        style_names = {}
+        for style in styles:
+            style_id = style.style_id
+            if style_id in style_names:
+                continue  # 与 python-docx 一样以第一个同ID样式为准
+            if style.type == WD_STYLE_TYPE.PARAGRAPH:
+                style_names[style_id] = style.name
+            else:
+                style_names[style_id] = default_style_name
+
+        return style_names, default_style_name
+
+    def _analyze_structure(self, paragraphs: List[ParagraphInfo]) -> TemplateStructure:
         """分析文档结构"""
         hierarchy = {}
         sections = []
-        placeholders = []
+        all_placeholders = set()
         max_level = 0
 
         current_section = None
         section_counter = 0
 
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if not text:
-                continue
+        for paragraph in paragraphs:
+            text = paragraph.text
 
             # 检查是否为标题
             heading_level = self._get_heading_level(paragraph)
@@ -197,6 +585,8 @@ class TemplateAnalyzer:
 
                 # 识别章节类型
                 section_type = self._identify_section_type(text)
+                title_placeholders = self._extract_placeholders(text)
+                all_placeholders.update(title_placeholders)
 
                 # 创建章节信息
                 section_info = {
@@ -206,7 +596,7 @@ class TemplateAnalyzer:
                     'type': section_type,
                     'paragraph_count': 0,
                     'word_count': len(text),
-                    'has_placeholder': bool(self._extract_placeholders(text))
+                    'has_placeholder': bool(title_placeholders)
                 }
 
                 sections.append(section_info)
@@ -225,92 +615,69 @@ class TemplateAnalyzer:
                 current_section['word_count'] += len(text)
 
                 # 提取占位符
-                paragraph_placeholders = self._extract_placeholders(text)
-                placeholders.extend(paragraph_placeholders)
-
-        # 统计所有占位符（包括标题中的）
-        all_placeholders = []
-        for section in sections:
-            section_placeholders = self._extract_placeholders(section['title'])
-            all_placeholders.extend(section_placeholders)
-        all_placeholders.extend(placeholders)
+                all_placeholders.update(self._extract_placeholders(text))
 
         return TemplateStructure(
             hierarchy=hierarchy,
             sections=sections,
             section_count=len(sections),
             max_heading_level=max_level,
-            placeholder_count=len(set(all_placeholders))
+            placeholder_count=len(all_placeholders)
         )
 
-    def _analyze_formatting(self, doc: Document) -> TemplateFormatting:
+    def _analyze_formatting(self, paragraphs: List[ParagraphInfo]) -> TemplateFormatting:
         """分析格式要求"""
         font_requirements = {}
         paragraph_styles = {}
         spacing_rules = {}
         alignment_rules = {}
 
-        font_usage = {}
-        style_usage = {}
-        alignment_usage = {}
-
-        for paragraph in doc.paragraphs:
-            if not paragraph.text.strip():
-                continue
+        font_usage = Counter()
+        style_usage = Counter()
+        alignment_usage = Counter()
 
+        for paragraph in paragraphs:
             # 分析字体
-            if paragraph.runs:
-                run = paragraph.runs[0]
-                font_name = run.font.name or '默认'
-                font_size = run.font.size
-
-                if font_size:
-                    # 转换为磅值
-                    font_size_pt = font_size.pt if hasattr(font_size, 'pt') else font_size
-                else:
-                    font_size_pt = 12  # 默认大小
+            if paragraph.has_runs:
+                font_name = paragraph.font_name or '默认'
+                font_size_pt = paragraph.font_size or 12  # 默认大小
 
                 font_key = f"{font_name}_{font_size_pt}pt"
-                font_usage[font_key] = font_usage.get(font_key, 0) + 1
+                font_usage[font_key] += 1
 
                 # 分析样式
-                style_name = paragraph.style.name if paragraph.style else 'Normal'
-                style_usage[style_name] = style_usage.get(style_name, 0) + 1
+                style_name = paragraph.style_name
+                style_usage[style_name] += 1
 
             # 分析对齐
             alignment = paragraph.alignment
             if alignment:
-                alignment_name = {
-                    WD_PARAGRAPH_ALIGNMENT.LEFT: '左对齐',
-                    WD_PARAGRAPH_ALIGNMENT.CENTER: '居中',
-                    WD_PARAGRAPH_ALIGNMENT.RIGHT: '右对齐',
-                    WD_PARAGRAPH_ALIGNMENT.JUSTIFY: '两端对齐',
-                    WD_PARAGRAPH_ALIGNMENT.DISTRIBUTE: '分散对齐'
-                }.get(alignment, '未知')
-                alignment_usage[alignment_name] = alignment_usage.get(alignment_name, 0) + 1
+                alignment_name = self._ALIGNMENT_NAMES.get(alignment, '未知')
+                alignment_usage[alignment_name] += 1
 
         # 提取主要要求
         if font_usage:
-            most_common_font = max(font_usage, key=font_usage.get)
+            most_common_font, most_common_count = font_usage.most_common(1)[0]
             font_requirements = {
                 'primary_font': most_common_font,
                 'font_variations': list(font_usage.keys()),
-                'consistency_score': len(font_usage) / max(font_usage.values())
+                # 主字体所占段落比例，1 表示全部段落使用同一字体
+                'consistency_score': most_common_count / sum(font_usage.values())
             }
 
         if style_usage:
-            most_common_style = max(style_usage, key=style_usage.get)
+            most_common_style = style_usage.most_common(1)[0][0]
             paragraph_styles = {
                 'primary_style': most_common_style,
                 'style_variations': list(style_usage.keys()),
-                'style_distribution': style_usage
+                'style_distribution': dict(style_usage)
             }
 
         if alignment_usage:
-            most_common_alignment = max(alignment_usage, key=alignment_usage.get)
+            most_common_alignment = alignment_usage.most_common(1)[0][0]
             alignment_rules = {
                 'primary_alignment': most_common_alignment,
-                'alignment_distribution': alignment_usage
+                'alignment_distribution': dict(alignment_usage)
             }
 
         return TemplateFormatting(
@@ -320,7 +687,7 @@ class TemplateAnalyzer:
             alignment_rules=alignment_rules
         )
 
-    def _analyze_content_requirements(self, doc: Document, template_name: str) -> ContentRequirements:
+    def _analyze_content_requirements(self, all_text: str, template_name: str) -> ContentRequirements:
         """分析内容要求"""
         word_limits = {}
         style_guide = {}
@@ -328,47 +695,36 @@ class TemplateAnalyzer:
         structure_requirements = []
 
         # 从模板名称和内容推断要求
-        all_text = '\n'.join(p.text for p in doc.paragraphs if p.text.strip())
-
         # 分析字数要求（从模板内容中提取）
-        word_limit_patterns = [
-            r'(\d+)[-~]?(\d+)?[个字]',
-            r'(\d+)[-~]?(\d+)?字',
-            r'不少于(\d+)字',
-            r'不超过(\d+)字'
-        ]
-
-        for pattern in word_limit_patterns:
-            matches = re.finditer(pattern, all_text)
-            for match in matches:
-                if match.group(2):
-                    # 范围
-                    word_limits['range'] = f"{match.group(1)}-{match.group(2)}字"
-                else:
-                    # 单一值
-                    word_limits['limit'] = f"{match.group(1)}字"
+        for match in self._word_limit_re.finditer(all_text):
+            if match.group('range'):
+                # 范围
+                word_limits['range'] = f"{match.group('low')}-{match.group('high')}字"
+            elif match.group('min'):
+                # 下限
+                word_limits['min'] = f"{match.group('min')}字"
+            elif match.group('max'):
+                # 上限
+                word_limits['max'] = f"{match.group('max')}字"
+            else:
+                # 单一值
+                word_limits['limit'] = f"{match.group('limit')}字"
 
         # 分析风格指南
-        style_indicators = {
-            '正式': ['正式', '规范', '标准', '严格'],
-            '简洁': ['简洁', '精炼', '简明', '概括'],
-            '详细': ['详细', '具体', '详尽', '完整'],
-            '技术性': ['技术', '专业', '术语', '规范']
-        }
-
-        for style, keywords in style_indicators.items():
-            count = sum(all_text.count(keyword) for keyword in keywords)
+        keyword_counts = self._count_keywords(all_text)
+        for style, keywords in self.style_indicators.items():
+            count = sum(keyword_counts[keyword] for keyword in keywords)
             if count > 0:
                 style_guide[style] = count
 
-        # 分析术语要求
-        technical_terms = re.findall(r'[专业|术语|标准|规范|规定]', all_text)
-        if technical_terms:
+        # 分析术语要求（按整词统计，复用上面的关键词扫描结果）
+        term_frequency = sum(keyword_counts[term] for term in self.terminology_terms)
+        if term_frequency:
             terminology['has_terminology_requirements'] = True
-            terminology['term_frequency'] = len(technical_terms)
+            terminology['term_frequency'] = term_frequency
 
-        # 分析结构要求
-        if '图' in all_text or '附图' in all_text:
+        # 分析结构要求（出现“附图”必然包含“图”，只需检查“图”）
+        if '图' in all_text:
             structure_requirements.append('包含图表或附图')
         if '实施例' in all_text or '具体实施' in all_text:
             structure_requirements.append('包含具体实施例')
@@ -382,38 +738,24 @@ class TemplateAnalyzer:
             structure_requirements=structure_requirements
         )
 
-    def _analyze_figure_requirements(self, doc: Document) -> FigureRequirements:
+    def _analyze_figure_requirements(self, all_text: str) -> FigureRequirements:
         """分析图表要求"""
-        all_text = '\n'.join(p.text for p in doc.paragraphs if p.text.strip())
-
-        formats = []
         numbering_rules = {}
         caption_format = {}
         placement_rules = {}
 
         # 分析支持的图表格式
-        format_keywords = {
-            '流程图': ['流程图', '流程', 'flow'],
-            '结构图': ['结构图', '结构', 'structure'],
-            '示意图': ['示意图', '示意', 'diagram'],
-            '框图': ['框图', '框图', 'block'],
-            '表格': ['表格', '表', 'table']
-        }
+        found_formats = set()
+        for match in self._figure_format_re.finditer(all_text):
+            found_formats.add(match.lastgroup)
+            if len(found_formats) == len(self.figure_format_keywords):
+                break
 
-        for format_type, keywords in format_keywords.items():
-            if any(keyword in all_text for keyword in keywords):
-                formats.append(format_type)
+        formats = [f for f in self.figure_format_keywords if f in found_formats]
 
         # 分析编号规则
-        numbering_patterns = [
-            (r'图\s*(\d+)', '数字编号'),
-            (r'图\s*(\d+)[-.](\d+)', '层级编号'),
-            (r'Figure\s*(\d+)', '英文编号'),
-            (r'Fig\.?\s*(\d+)', '缩写编号')
-        ]
-
-        for pattern, rule_type in numbering_patterns:
-            if re.search(pattern, all_text):
+        for pattern, rule_type in self._numbering_patterns_compiled:
+            if pattern.search(all_text):
                 numbering_rules[rule_type] = True
 
         # 分析标题格式
@@ -437,7 +779,7 @@ class TemplateAnalyzer:
             placement_rules=placement_rules
         )
 
-    def _analyze_intelligence(self, doc: Document, structure: TemplateStructure,
+    def _analyze_intelligence(self, all_text: str, structure: TemplateStructure,
                             content_req: ContentRequirements) -> TemplateIntelligence:
         """智能分析"""
         complexity_score = 0.0
@@ -461,33 +803,29 @@ class TemplateAnalyzer:
         factors.append(('hierarchy', hierarchy_complexity))
 
         # 格式复杂度（基于章节类型多样性）
-        section_types = len(set(s['type'] for s in structure.sections))
-        format_complexity = min(section_types / 5.0, 1.0)
+        found_sections = {s['type'] for s in structure.sections}
+        format_complexity = min(len(found_sections) / 5.0, 1.0)
         factors.append(('format', format_complexity))
 
         # 计算加权平均复杂度
         weights = {'structure': 0.3, 'placeholder': 0.2, 'hierarchy': 0.2, 'format': 0.3}
         complexity_score = sum(score * weights.get(name, 0.2) for name, score in factors)
 
-        # 识别适用领域
-        all_text = '\n'.join(p.text for p in doc.paragraphs if p.text.strip())
+        # 识别适用领域（只需判断是否出现过该领域的任一关键词，不需要累加次数）
+        found_keywords = self._count_keywords(all_text).keys()
         for domain, keywords in self.domain_keywords.items():
-            domain_score = sum(all_text.count(keyword) for keyword in keywords)
-            if domain_score > 0:
+            if not found_keywords.isdisjoint(keywords):
                 applicable_domains.append(domain)
 
         # 计算质量评分
         quality_factors = []
 
         # 完整性评分
-        required_sections = ['标题', '技术领域', '背景技术', '发明内容', '权利要求书', '摘要']
-        found_sections = [s['type'] for s in structure.sections]
-        completeness = len(set(required_sections) & set(found_sections)) / len(required_sections)
+        completeness = len(_REQUIRED_SECTIONS & found_sections) / len(_REQUIRED_SECTIONS)
         quality_factors.append(('completeness', completeness))
 
         # 标准化评分
-        standard_patterns = ['权利要求', '附图说明', '具体实施方式']
-        standard_score = sum(1 for pattern in standard_patterns if pattern in all_text) / len(standard_patterns)
+        standard_score = sum(1 for pattern in _STANDARD_PATTERNS if pattern in all_text) / len(_STANDARD_PATTERNS)
         quality_factors.append(('standardization', standard_score))
 
         # 清晰度评分（基于占位符使用）
@@ -500,7 +838,11 @@ class TemplateAnalyzer:
 
         # 生成改进建议
         if completeness < 0.8:
-            missing_sections = set(required_sections) - set(found_sections)
+            # 按章节定义顺序列出，保证建议文本稳定
+            missing_sections = [
+                section_type for section_type in self.patent_section_patterns
+                if section_type in _REQUIRED_SECTIONS and section_type not in found_sections
+            ]
             suggestions.append(f"建议添加缺失的标准章节: {', '.join(missing_sections)}")
 
         if structure.placeholder_count == 0:
@@ -529,52 +871,66 @@ class TemplateAnalyzer:
             completeness_score=completeness
         )
 
-    def _get_heading_level(self, paragraph) -> int:
+    def _count_keywords(self, text: str) -> Counter:
+        """单次扫描统计领域关键词、风格指示词和术语规范词的出现次数"""
+        return Counter(match.group(1) for match in self._keyword_re.finditer(text))
+
+    def _get_heading_level(self, paragraph: ParagraphInfo) -> int:
         """获取段落的标题级别"""
-        if paragraph.style.name.startswith('Heading'):
+        style_name = paragraph.style_name
+        if style_name.startswith('Heading'):
             try:
-                return int(paragraph.style.name.split()[-1])
+                return int(style_name.split()[-1])
             except (ValueError, IndexError):
                 pass
 
-        # 基于字体大小判断
-        if paragraph.runs:
-            max_font_size = 0
-            for run in paragraph.runs:
-                if run.font.size:
-                    size = run.font.size.pt if hasattr(run.font.size, 'pt') else run.font.size
-                    max_font_size = max(max_font_size, size)
-
-            if max_font_size >= 20:
-                return 1
-            elif max_font_size >= 16:
-                return 2
-            elif max_font_size >= 14:
-                return 3
-            elif max_font_size >= 12:
-                return 4
-
-        return 0  # 不是标题
+        # 基于字体大小判断（没有 run 时最大字号为 0，即不是标题）
+        index = bisect.bisect_right(_HEADING_FONT_THRESHOLDS, paragraph.max_font_size)
+        return _HEADING_LEVELS_BY_FONT[index]
 
     def _identify_section_type(self, title: str) -> str:
         """识别章节类型"""
         title_lower = title.lower()
 
-        for section_type, pattern in self.patent_section_patterns.items():
-            if re.search(pattern, title, re.IGNORECASE):
+        section_type = self._section_literal_map.get(title_lower)
+        if section_type is not None:
+            return section_type
+
+        for section_type, keywords, pattern in self._section_matchers:
+            if keywords is not None:
+                if any(keyword in title_lower for keyword in keywords):
+                    return section_type
+            elif pattern.search(title):
                 return section_type
 
         return '其他章节'
 
     def _extract_placeholders(self, text: str) -> List[str]:
         """提取文本中的占位符"""
+        # 大部分正文段落不含任何占位符定界符，先用子串检查跳过正则扫描
+        if '{' not in text and '<' not in text and '[' not in text:
+            return []
+
         placeholders = []
+        seen = set()
+
+        for match in self._placeholder_re.finditer(text):
+            placeholder = match.group(match.lastindex).strip()
+            if placeholder and placeholder not in seen:
+                seen.add(placeholder)
+                placeholders.append(placeholder)
+
+        return placeholders
+
+
+# 进程池工作进程内复用的分析器实例（预编译正则每个进程只构建一次）
+_worker_analyzer: Optional[TemplateAnalyzer] = None
 
-        for pattern in self.placeholder_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                placeholder = match.group(1).strip()
-                if placeholder and placeholder not in placeholders:
-                    placeholders.append(placeholder)
 
-        return placeholders
\ No newline at end of file
+def _analyze_template_in_worker(template_path: str, template_id: str, template_name: str) -> TemplateAnalysis:
+    """进程池工作函数：在工作进程中分析单个模板"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = TemplateAnalyzer()
+    return _worker_analyzer.analyze_template(template_path, template_id, template_name,
+                                             use_cache=False, eager=True)
@@ -4,18 +4,48 @@
 提供 REST API 接口来管理和操作专利模板。
 """
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, current_app, jsonify, request, send_file
 from pathlib import Path
 import os
 import logging
 from typing import Any, Dict, Optional
 
+try:
+    # orjson 为可选依赖，序列化模板列表、分析结果等大型响应时比标准库 json 快数倍
+    import orjson
+except ImportError:
+    orjson = None
+
 # 创建蓝图
 template_bp = Blueprint('template', __name__, url_prefix='/api/templates')
 
 logger = logging.getLogger(__name__)
 
 
+def _json_default(obj: Any) -> Any:
+    """orjson 无法直接序列化的对象：Path 转为字符串，其余交给 Flask 的默认处理"""
+    if isinstance(obj, Path):
+        return str(obj)
+    return current_app.json.default(obj)
+
+
+def _json(payload: Any, status: int = 200):
+    """
+    构建 JSON 响应
+
+    安装了 orjson 时直接序列化为 UTF-8 字节，否则回退到 jsonify。
+    日期时间仍交给 Flask 的默认处理，键排序与应用的 JSON 配置一致，输出格式与 jsonify 相同。
+    """
+    if orjson is None:
+        return jsonify(payload), status
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if getattr(current_app.json, 'sort_keys', False):
+        option |= orjson.OPT_SORT_KEYS
+    body = orjson.dumps(payload, default=_json_default, option=option)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
 @template_bp.route('/', methods=['GET'])
 def get_templates():
     """获取所有模板列表"""
@@ -59,16 +89,16 @@ def get_templates():
         }
 
         logger.info(f"✅ 模板列表请求成功，返回模板数量: {len(templates)}")
-        return jsonify(result)
+        return _json(result)
     except Exception as e:
         logger.error(f"❌ 获取模板列表失败: {e}")
         import traceback
         logger.error(f"详细错误: {traceback.format_exc()}")
 
-        return jsonify({
+        return _json({
             'ok': False,
             'error': f"获取模板列表失败: {str(e)}"
-        }), 500
+        }, 500)
 
 
 @template_bp.route('/<template_id>/info', methods=['GET'])
@@ -81,18 +111,18 @@ def get_template_info(template_id: str):
             template_info = manager.get_template_info(template_id)
 
             if not template_info:
-                return jsonify({
+                return _json({
                     'ok': False,
                     'error': f"模板不存在: {template_id}"
-                }), 404
+                }, 404)
 
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template': template_info
             })
         except Exception as e:
             # 返回默认模板信息
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template': {
                     'id': template_id,
@@ -108,10 +138,10 @@ def get_template_info(template_id: str):
             })
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': f"获取模板信息失败: {str(e)}"
-        }), 500
+        }, 500)
 
 
 @template_bp.route('/<template_id>/content', methods=['GET'])
@@ -124,13 +154,13 @@ def get_template_content(template_id: str):
             template_info = manager.get_template_info(template_id)
 
             if not template_info:
-                return jsonify({
+                return _json({
                     'ok': False,
                     'error': f"模板不存在: {template_id}"
-                }), 404
+                }, 404)
 
             # 返回模板的基本信息，不返回完整文档内容
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template_id': template_id,
                 'name': template_info['name'],
@@ -141,7 +171,7 @@ def get_template_content(template_id: str):
             })
         except Exception as e:
             # 返回默认模板内容
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template_id': template_id,
                 'name': '默认模板',
@@ -152,10 +182,10 @@ def get_template_content(template_id: str):
             })
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': f"获取模板内容失败: {str(e)}"
-        }), 500
+        }, 500)
 
 
 @template_bp.route('/default', methods=['GET'])
@@ -168,18 +198,18 @@ def get_default_template():
             default_template = manager.get_default_template()
 
             if not default_template:
-                return jsonify({
+                return _json({
                     'ok': False,
                     'error': "未找到默认模板"
-                }), 404
+                }, 404)
 
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template': default_template
             })
         except Exception as e:
             # 返回默认模板
-            return jsonify({
+            return _json({
                 'ok': True,
                 'template': {
                     'id': 'default',
@@ -192,10 +222,10 @@ def get_default_template():
             })
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': f"获取默认模板失败: {str(e)}"
-        }), 500
+        }, 500)
 
 
 @template_bp.route('/analyze', methods=['POST'])
@@ -206,19 +236,19 @@ def analyze_template():
 
         data = request.get_json()
         if not data:
-            return jsonify({
+            return _json({
                 'ok': False,
                 'error': '请求数据格式错误'
-            }), 400
+            }, 400)
 
         template_id = data.get('template_id')
         custom_prompt = data.get('custom_prompt')
 
         if not template_id:
-            return jsonify({
+            return _json({
                 'ok': False,
                 'error': '缺少模板ID'
-            }), 400
+            }, 400)
 
         print("="*80)
         print("🚀 [模板分析] 开始处理模板分析请求")
@@ -489,10 +519,10 @@ def analyze_template():
 
         except Exception as e:
             logger.error(f"❌ 构建分析提示词失败: {e}")
-            return jsonify({
+            return _json({
                 'ok': False,
                 'error': f"构建分析提示词失败: {str(e)}"
-            }), 500
+            }, 500)
 
         # 调用LLM进行分析
         print("🤖 [LLM分析] 开始调用LLM进行模板分析...")
@@ -594,7 +624,7 @@ def analyze_template():
         logger.info("🎉 模板分析完成，返回结果")
         print("🚀 [API响应] 发送模板分析响应给前端")
         print("="*80)
-        return jsonify(result)
+        return _json(result)
 
     except Exception as e:
         import traceback
@@ -616,7 +646,7 @@ def analyze_template():
 
         print(f"🚨 [错误响应] 发送错误响应: {error_response}")
         print("="*80)
-        return jsonify(error_response), 500
+        return _json(error_response, 500)
 
 
 @template_bp.route('/reload', methods=['POST'])
@@ -628,14 +658,14 @@ def reload_templates():
             manager = get_template_manager()
             manager.reload_templates()
 
-            return jsonify({
+            return _json({
                 'ok': True,
                 'message': "模板已重新加载",
                 'stats': manager.get_stats()
             })
         except Exception as e:
             logger.warning(f"模板管理器不可用，返回成功状态: {e}")
-            return jsonify({
+            return _json({
                 'ok': True,
                 'message': "模板已重新加载（使用默认配置）",
                 'stats': {
@@ -646,10 +676,10 @@ def reload_templates():
             })
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': f"重新加载模板失败: {str(e)}"
-        }), 500
+        }, 500)
 
 
 def register_template_api(app):
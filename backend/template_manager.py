@@ -5,6 +5,7 @@
 """
 
 import os
+import copy
 import json
 import logging
 import time
@@ -225,6 +226,12 @@ class TemplateManager:
         # 分析缓存
         self._analysis_cache: Dict[str, Dict[str, Any]] = {}
 
+        # 分析摘要缓存，按 (template_id, 文件mtime) 索引
+        self._summary_cache: Dict[Tuple[str, float], Dict[str, Any]] = {}
+
+        # 模板信息缓存：template_id -> (生成时的模板状态, to_dict() 结果)
+        self._info_cache: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {}
+
         logger.info(f"模板管理器初始化，目录: {self.template_dir}")
 
         # 确保模板目录存在
@@ -293,9 +300,19 @@ class TemplateManager:
         return [template.to_dict() for template in self.templates.values()]
 
     def get_template_info(self, template_id: str) -> Optional[Dict[str, Any]]:
-        """获取指定模板信息"""
+        """获取指定模板信息（按模板状态缓存，返回副本，调用方修改不会影响缓存）"""
         template = self.templates.get(template_id)
-        return template.to_dict() if template else None
+        if not template:
+            return None
+
+        # 文件属性在加载时确定，之后只有元数据和分析状态会变化
+        state = (template.name, template.description, template.analysis is not None,
+                 template.analysis_timestamp)
+        cached = self._info_cache.get(template_id)
+        if cached is None or cached[0] != state:
+            cached = (state, template.to_dict())
+            self._info_cache[template_id] = cached
+        return copy.deepcopy(cached[1])
 
     def get_default_template(self) -> Optional[Dict[str, Any]]:
         """获取默认模板"""
@@ -376,6 +393,8 @@ class TemplateManager:
         """重新加载所有模板"""
         logger.info("重新加载模板")
         self.templates.clear()
+        self._summary_cache.clear()
+        self._info_cache.clear()
         self.default_template_id = None
         self._load_templates()
         self.load_template_metadata()
@@ -397,11 +416,9 @@ class TemplateManager:
             return None
 
         # 检查缓存
-        if not force_reanalyze and template.analysis and template.analysis_cached:
-            # 检查文件是否被修改
-            if template.modified_at and template.modified_at.timestamp() <= template.analysis_timestamp:
-                logger.debug(f"使用缓存的分析结果: {template_id}")
-                return template.analysis
+        if not force_reanalyze and self._has_fresh_analysis(template):
+            logger.debug(f"使用缓存的分析结果: {template_id}")
+            return template.analysis
 
         try:
             logger.info(f"开始深度分析模板: {template.name} ({template_id})")
@@ -411,20 +428,12 @@ class TemplateManager:
             analysis = self.analyzer.analyze_template(
                 template.file_path,
                 template.template_id,
-                template.name
+                template.name,
+                use_cache=not force_reanalyze
             )
 
             # 缓存结果
-            template.analysis = analysis
-            template.analysis_timestamp = time.time()
-            template.analysis_cached = True
-
-            # 更新内存缓存
-            self._analysis_cache[template_id] = {
-                'analysis_data': analysis,
-                'timestamp': template.analysis_timestamp,
-                'file_mtime': template.modified_at.timestamp() if template.modified_at else 0
-            }
+            self._store_template_analysis(template, analysis)
 
             # 保存缓存到文件
             self._save_analysis_cache()
@@ -439,6 +448,31 @@ class TemplateManager:
             template.analysis_cached = False
             return None
 
+    def _has_fresh_analysis(self, template: TemplateInfo) -> bool:
+        """模板是否已有缓存的分析结果且文件在分析后未被修改"""
+        return bool(
+            template.analysis and template.analysis_cached
+            and template.modified_at
+            and template.modified_at.timestamp() <= template.analysis_timestamp
+        )
+
+    def _store_template_analysis(self, template: TemplateInfo, analysis: TemplateAnalysis):
+        """将分析结果保存到模板对象和内存缓存"""
+        template.analysis = analysis
+        template.analysis_timestamp = time.time()
+        template.analysis_cached = True
+
+        # 新的分析结果使该模板已缓存的摘要失效（强制重新分析时文件 mtime 不变）
+        for key in [k for k in self._summary_cache if k[0] == template.template_id]:
+            del self._summary_cache[key]
+
+        # 更新内存缓存
+        self._analysis_cache[template.template_id] = {
+            'analysis_data': analysis,
+            'timestamp': template.analysis_timestamp,
+            'file_mtime': template.modified_at.timestamp() if template.modified_at else 0
+        }
+
     def get_template_analysis_summary(self, template_id: str) -> Optional[Dict[str, Any]]:
         """
         获取模板分析摘要（用于API返回）
@@ -449,22 +483,42 @@ class TemplateManager:
         Returns:
             Dict: 分析摘要，如果失败返回None
         """
+        template = self.templates.get(template_id)
+        cache_key = None
+        if template:
+            try:
+                cache_key = (template_id, os.path.getmtime(template.file_path))
+            except OSError:
+                cache_key = None
+
+        if cache_key in self._summary_cache:
+            logger.debug(f"使用缓存的分析摘要: {template_id}")
+            return copy.deepcopy(self._summary_cache[cache_key])
+
         analysis = self.get_template_analysis(template_id)
         if not analysis:
             return None
 
-        return {
+        summary = {
             'complexity_score': round(analysis.intelligence.complexity_score, 3),
             'quality_score': round(analysis.intelligence.quality_score, 3),
             'completeness_score': round(analysis.intelligence.completeness_score, 3),
             'template_type': analysis.intelligence.template_type,
-            'applicable_domains': analysis.intelligence.applicable_domains,
+            'applicable_domains': list(analysis.intelligence.applicable_domains),
             'section_count': analysis.structure.section_count,
             'placeholder_count': analysis.structure.placeholder_count,
             'suggestions_count': len(analysis.intelligence.suggestions),
             'analysis_timestamp': analysis.analyzed_at
         }
 
+        if cache_key is not None:
+            # 模板文件更新后 mtime 变化，旧条目不再命中
+            for key in [k for k in self._summary_cache if k[0] == template_id]:
+                del self._summary_cache[key]
+            self._summary_cache[cache_key] = summary
+
+        return copy.deepcopy(summary)
+
     def analyze_all_templates(self, force_reanalyze: bool = False) -> Dict[str, Any]:
         """
         分析所有模板
@@ -486,13 +540,33 @@ class TemplateManager:
             'details': {}
         }
 
+        # 需要(重新)分析的模板先交给分析器在进程池中并行分析，下面汇总时直接使用结果
+        pending = [
+            template for template in self.templates.values()
+            if template.is_valid and (force_reanalyze or not self._has_fresh_analysis(template))
+        ]
+        prefetched = set()
+        if len(pending) > 1:
+            analyses = self.analyzer.analyze_templates(
+                [(template.file_path, template.template_id, template.name) for template in pending],
+                use_cache=not force_reanalyze
+            )
+            for template, analysis in zip(pending, analyses):
+                if analysis:
+                    self._store_template_analysis(template, analysis)
+                    prefetched.add(template.template_id)
+            self._save_analysis_cache()
+
         for template_id, template in self.templates.items():
             if not template.is_valid:
                 results['skipped'] += 1
                 continue
 
             try:
-                analysis = self.get_template_analysis(template_id, force_reanalyze)
+                # 已并行分析过的模板直接命中缓存，失败的模板在这里单独重试
+                analysis = self.get_template_analysis(
+                    template_id, force_reanalyze and template_id not in prefetched
+                )
                 if analysis:
                     results['analyzed'] += 1
                     results['details'][template_id] = {
@@ -0,0 +1,97 @@
+"""
+simple_server 单元测试
+
+覆盖模拟异步任务的取消：取消后状态保持 cancelled，统计计数正确。
+运行: cd backend && python -m pytest test_simple_server.py  (或 python -m unittest test_simple_server)
+"""
+
+import time
+import unittest
+from unittest import mock
+
+import simple_server
+
+# 缩短模拟阶段的间隔，使测试在一秒内完成
+_FAST_STAGES = (
+    (0.05, 20, "正在分析代码..."),
+    (0.1, 50, "正在生成专利草案..."),
+    (0.15, 100, "任务完成"),
+)
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    """轮询等待条件成立"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class SimpleServerTaskTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(simple_server, "_SIMULATED_STAGES", _FAST_STAGES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with simple_server._tasks_lock:
+            simple_server.tasks.clear()
+            simple_server.status_counts.clear()
+        self.client = simple_server.app.test_client()
+
+    def _submit(self):
+        return self.client.post("/api/generate/async", json={"iterations": 1}).get_json()["taskId"]
+
+    def _task(self, task_id):
+        return self.client.get(f"/api/tasks/{task_id}").get_json()
+
+    def _status_counts(self):
+        return self.client.get("/api/tasks/statistics").get_json()["statistics"]["status_counts"]
+
+    def test_cancelled_task_stays_cancelled(self):
+        cancelled_id = self._submit()
+        other_id = self._submit()
+
+        # 等任务进入 running 后再取消，之后的阶段不能再改写状态
+        self.assertTrue(_wait_for(lambda: self._task(cancelled_id)["status"] == "running"))
+        response = self.client.post(f"/api/tasks/{cancelled_id}/cancel")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertTrue(_wait_for(lambda: self._task(other_id)["status"] == "completed"))
+        time.sleep(0.1)
+
+        task = self._task(cancelled_id)
+        self.assertEqual(task["status"], "cancelled")
+        self.assertIsNone(task["result"])
+        self.assertIsNotNone(task["completedAt"])
+        self.assertEqual(self._status_counts(), {"cancelled": 1, "completed": 1})
+
+        # 已取消的任务不能再次取消
+        response = self.client.post(f"/api/tasks/{cancelled_id}/cancel")
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancel_pending_task_before_first_stage(self):
+        task_id = self._submit()
+        response = self.client.post(f"/api/tasks/{task_id}/cancel")
+        self.assertEqual(response.status_code, 200)
+
+        time.sleep(0.3)
+        self.assertEqual(self._task(task_id)["status"], "cancelled")
+        self.assertEqual(self._status_counts(), {"cancelled": 1})
+        self.assertNotIn(task_id, simple_server._task_events)
+
+    def test_cancelled_task_moves_to_finished_tail(self):
+        running_id = self._submit()
+        cancelled_id = self._submit()
+        self.client.post(f"/api/tasks/{cancelled_id}/cancel")
+
+        # 已结束的任务排在未结束任务之后，淘汰时不会越过进行中的任务
+        self.assertEqual(list(simple_server.tasks), [running_id, cancelled_id])
+        self.assertTrue(_wait_for(lambda: self._task(running_id)["status"] == "completed"))
+        self.assertEqual(self._task(cancelled_id)["status"], "cancelled")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+TaskManager 单元测试
+
+覆盖排队任务的执行顺序、排队期间取消以及 stop() 的清理行为。
+运行: cd backend && python -m pytest test_task_manager.py  (或 python -m unittest test_task_manager)
+"""
+
+import threading
+import time
+import unittest
+
+from task_manager import TaskManager, TaskStatus
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    """轮询等待条件成立"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TaskManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = TaskManager(max_workers=1)
+        self.manager.start()
+        self.release = threading.Event()
+        self.blocker_started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.manager.stop()
+
+    def _blocker(self, progress_callback=None):
+        self.blocker_started.set()
+        self.release.wait(5)
+        return "blocker"
+
+    def _status(self, task_id):
+        return self.manager.get_task_status(task_id)["status"]
+
+    def test_queued_tasks_run_in_submission_order(self):
+        order = []
+
+        def record(index, progress_callback=None):
+            order.append(index)
+            return index
+
+        self.manager.submit_task(self._blocker)
+        self.assertTrue(self.blocker_started.wait(5))
+        task_ids = [self.manager.submit_task(record, i) for i in range(5)]
+        self.assertTrue(all(self._status(t) == "pending" for t in task_ids))
+
+        self.release.set()
+        self.assertTrue(_wait_for(lambda: all(self._status(t) == "completed" for t in task_ids)))
+        self.assertEqual(order, list(range(5)))
+
+    def test_cancel_while_queued(self):
+        ran = []
+
+        self.manager.submit_task(self._blocker)
+        self.assertTrue(self.blocker_started.wait(5))
+        queued_id = self.manager.submit_task(lambda progress_callback=None: ran.append(True))
+        after_id = self.manager.submit_task(lambda progress_callback=None: "after")
+
+        self.assertTrue(self.manager.cancel_task(queued_id))
+        status = self.manager.get_task_status(queued_id)
+        self.assertEqual(status["status"], "cancelled")
+        self.assertIsNotNone(status["completedAt"])
+        self.assertFalse(self.manager.cancel_task(queued_id))
+
+        self.release.set()
+        self.assertTrue(_wait_for(lambda: self._status(after_id) == "completed"))
+        self.assertEqual(ran, [])
+
+        counts = self.manager.get_statistics()["status_counts"]
+        self.assertEqual(counts["pending"], 0)
+        self.assertEqual(counts["cancelled"], 1)
+        self.assertEqual(counts["completed"], 2)
+
+    def test_stop_cancels_running_and_queued_tasks(self):
+        ran = []
+
+        running_id = self.manager.submit_task(self._blocker)
+        self.assertTrue(self.blocker_started.wait(5))
+        queued_ids = [
+            self.manager.submit_task(lambda progress_callback=None: ran.append(True))
+            for _ in range(3)
+        ]
+
+        self.manager.stop()
+
+        self.assertEqual(self._status(running_id), "cancelled")
+        for task_id in queued_ids:
+            status = self.manager.get_task_status(task_id)
+            self.assertEqual(status["status"], "cancelled")
+            self.assertIsNotNone(status["completedAt"])
+
+        counts = self.manager.get_statistics()["status_counts"]
+        self.assertEqual(counts["pending"], 0)
+        self.assertEqual(counts["cancelled"], 4)
+        # 排队中被取消的任务进入过期清理堆
+        expiring = {task_id for _, task_id in self.manager._expiry_heap}
+        self.assertTrue(set(queued_ids) <= expiring)
+
+        # 工作线程是守护线程，不会阻塞解释器退出
+        self.assertTrue(all(t.daemon for t in threading.enumerate() if t.name.startswith("task-worker")))
+
+        # 放行正在运行的任务后，已取消的排队任务不会再执行
+        self.release.set()
+        self.assertTrue(_wait_for(lambda: not self.manager.running_tasks))
+        time.sleep(0.05)
+        self.assertEqual(ran, [])
+
+    def test_restart_after_stop_runs_new_tasks(self):
+        self.manager.stop()
+        self.manager.start()
+        task_id = self.manager.submit_task(lambda progress_callback=None: 42)
+        self.assertTrue(_wait_for(lambda: self._status(task_id) == "completed"))
+        self.assertEqual(self.manager.get_task_status(task_id)["result"], 42)
+
+
+if __name__ == "__main__":
+    unittest.main()
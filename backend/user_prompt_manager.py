@@ -39,6 +39,14 @@ class UserPromptManager:
         # 默认用户ID（单用户系统）
         self.default_user_id = "default"
 
+        # 数据版本号，每次成功保存后递增，供调用方判断缓存是否失效
+        self.version = 0
+
+        # 已设置非空提示词的类型及对应数据文件的修改时间，每次加载/保存数据时更新
+        self._nonempty_roles = set()
+        self._data_mtime = None
+        self._load_data()
+
         logger.info(f"用户提示词管理器初始化完成，数据文件: {self.data_file}")
 
     def _ensure_data_dir(self):
@@ -52,6 +60,7 @@ class UserPromptManager:
 
     def _load_data(self) -> Dict[str, Any]:
         """加载用户提示词数据"""
+        self._data_mtime = self._get_data_mtime()
         try:
             if not self.data_file.exists():
                 return self._create_default_data()
@@ -64,6 +73,7 @@ class UserPromptManager:
                 logger.warning("用户提示词数据格式不正确，使用默认数据")
                 return self._create_default_data()
 
+            self._update_nonempty_roles(data)
             logger.debug(f"成功加载用户提示词数据，包含 {len(data.get('prompts', {}))} 个提示词")
             return data
 
@@ -74,8 +84,43 @@ class UserPromptManager:
             logger.error(f"加载用户提示词数据失败: {e}")
             return self._create_default_data()
 
+    def _get_data_mtime(self) -> Optional[float]:
+        """获取数据文件修改时间，文件不存在时返回None"""
+        try:
+            return self.data_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def _update_nonempty_roles(self, data: Dict[str, Any]):
+        """根据数据刷新已设置非空提示词的类型集合"""
+        prompts = data.get('prompts') or {}
+        self._nonempty_roles = {
+            role for role, prompt in prompts.items()
+            if isinstance(prompt, str) and prompt.strip()
+        }
+
+    def has_any(self, prompt_type: str = None) -> bool:
+        """
+        快速判断是否设置了自定义提示词（数据文件未变化时不读取文件）
+
+        Args:
+            prompt_type: 提示词类型，为空时判断是否设置了任意类型
+
+        Returns:
+            设置了对应提示词返回True
+        """
+        # 其他进程或手工修改了数据文件时重新加载
+        if self._get_data_mtime() != self._data_mtime:
+            self._load_data()
+
+        if prompt_type is None:
+            return bool(self._nonempty_roles)
+        return prompt_type in self._nonempty_roles
+
     def _create_default_data(self) -> Dict[str, Any]:
         """创建默认数据结构"""
+        # 默认数据不包含任何自定义提示词
+        self._nonempty_roles = set()
         return {
             "user_id": self.default_user_id,
             "prompts": {
@@ -101,6 +146,9 @@ class UserPromptManager:
 
             # 原子性替换
             temp_file.replace(self.data_file)
+            self.version += 1
+            self._update_nonempty_roles(data)
+            self._data_mtime = self._get_data_mtime()
 
             logger.debug("用户提示词数据保存成功")
             return True
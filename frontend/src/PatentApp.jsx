@@ -73,6 +73,28 @@ function PatentApp() {
     loadUserPrompts();
   }, []);
 
+  // 轮询后台 DOCX 生成状态
+  const pollDocxStatus = async (conversationTaskId, onSettled) => {
+    const maxAttempts = 150; // 最多轮询5分钟
+
+    for (let attempts = 0; attempts < maxAttempts; attempts++) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      try {
+        const response = await fetch(`/api/conversations/tasks/${conversationTaskId}/docx`);
+        if (!response.ok) continue;
+
+        const data = await response.json();
+        const docxStatus = data.success ? data.data.docx_status : null;
+        if (docxStatus === "completed" || docxStatus === "failed") {
+          onSettled(docxStatus);
+          return;
+        }
+      } catch (error) {
+        console.error("查询 DOCX 状态失败:", error);
+      }
+    }
+  };
+
   // 轮询任务状态
   const pollTaskStatus = async (taskId) => {
     const maxAttempts = 600; // 最多轮询10分钟
@@ -118,21 +140,36 @@ function PatentApp() {
         setStatus(data.message || `任务进行中... (${data.progress || 0}%)`);
 
         if (data.status === "completed") {
-          let resultText = `任务完成！\n\n输出文件：${data.result.outputPath}\n迭代轮数：${data.result.iterations}`;
-
-          // 如果使用了模板，添加 DOCX 文件信息
-          if (data.result.docx_path) {
-            resultText += `\nDOCX 文件：${data.result.docx_path}`;
-            if (data.result.template_used) {
-              resultText += `\n使用模板：${data.result.template_id || '未知'}`;
+          const buildResultText = (docxStatus) => {
+            let resultText = `任务完成！\n\n输出文件：${data.result.outputPath}\n迭代轮数：${data.result.iterations}`;
+
+            // 如果使用了模板，添加 DOCX 文件信息
+            if (data.result.docx_path) {
+              resultText += `\nDOCX 文件：${data.result.docx_path}`;
+              if (docxStatus === "pending") {
+                resultText += "（后台生成中）";
+              } else if (docxStatus === "failed") {
+                resultText += "（生成失败）";
+              }
+              if (data.result.template_used) {
+                resultText += `\n使用模板：${data.result.template_id || '未知'}`;
+              }
             }
-          }
 
-          resultText += `\n\n最后一轮评审预览：\n${data.result.lastReview ? data.result.lastReview.substring(0, 1000) + "..." : "无"}`;
+            resultText += `\n\n最后一轮评审预览：\n${data.result.lastReview ? data.result.lastReview.substring(0, 1000) + "..." : "无"}`;
+            return resultText;
+          };
 
-          setResultText(resultText);
+          setResultText(buildResultText(data.result.docx_status));
           setLoading(false);
 
+          // DOCX 在后台生成，继续轮询直到生成完成或失败
+          if (data.result.docx_status === "pending" && data.result.task_id) {
+            pollDocxStatus(data.result.task_id, (docxStatus) => {
+              setResultText(buildResultText(docxStatus));
+            });
+          }
+
           // 保存task_id并显示对话查看器
           if (data.result && data.result.task_id) {
             setCurrentTaskId(data.result.task_id);